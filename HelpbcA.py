@@ -39,10 +39,10 @@ help_bcStackP = """Creates 2D stacked profiles for survey data along lines and t
 <b>Base parameters</b>
 * <b>Input vector</b> [required]: Must be a point layer having the following fields: Fiducial, Line number and data.
 * <b>Fiducial field</b> [required]: Fiducial are unique number increasing monotonically over all the data points. It is used to sort the lines by increasing coordinates.
-* <b>Line field</b> [required]: Line number field in order to sort the stacked profiles correctly.
-* <b>Data field</b> [required]: The field from which the stacked profiles are generated. Must be a numeric field.
+* <b>Line field</b> [required]: Line number field in order to sort the stacked profiles correctly. The points of a line do not need to be contiguous in the layer: no pre-sort is required.
+* <b>Data field</b> [required]: The field(s) from which the stacked profiles are generated. Must be numeric fields. Several channels (e.g. TMI, radiometric windows, EM channels) are read together in a single pass over the layer and share the coordinates, line geometry and line classification; each channel gets its own dummy values, statistics and scaling and its profiles are written to the output with a Channel field.
 * <b>Dummy value</b> [optional]: Value for invalid or missing data. Default: 9999.00.
-* <b>Inverse profiles?</b> [optional]: By default, stacked profiles are displayed above the line to which they relate. Check that option to display profiles below their lines. Note that this depends on the azimuth of the first line found in the layer. If it is positive the default is to plot profiles on top of the line. If the azimuth is negative, the profiles will be displyed below the line by default.
+* <b>Inverse profiles?</b> [optional]: By default, stacked profiles are displayed on the same side of all parallel lines, whatever the direction the lines were surveyed. Check that option to display profiles on the other side of their lines. Lines and tie-lines are told apart from the histogram of the azimuths of all lines (modulo 180&deg;, weighted by line length): the main direction is the lines', the main direction more than 20&deg; away from it is the tie-lines'. The side of the profiles is set by the heading of the first line flown (lowest fiducial) of each direction, so that it does not change when lines are added to the survey. The result does not depend on the order of the lines in the layer.
 * <b>Profile scale</b> [optional]: Stacked profiles data need to be scaled to display properly. Mainly because the unit of the data is generally not the units used for the coordinates. Here, the scale factor is the ratio of data amplitude over the length of the longest line. You will have to experiment to find the correct value. Note that the default value (3) would generally be far too much. A 0.3 value could be just good!
 * <b>Profile offset</b> [optional]: This is the distance between line and profile. Experiment to arrive at something meaningfull! 0. is the default, but it does not mean that the profile is display on the line!
 * <b>Join profile to line?</b> [optional]: By default profiles are "floating" over the lines. Check this option to link profiles ends to lines ends. This can be visually nicer!!
@@ -51,16 +51,37 @@ help_bcStackP = """Creates 2D stacked profiles for survey data along lines and t
 <b>Advanced parameters</b>
 * <b>Scale profile relative to another channel?</b>: If you want to compare profiles from different channels in your layer you can then check 'Do scaling relative to another channel?' and select the channel used for scaling the profiles. Default is False.
 * <b>Scaling layer</b>: If the previous option is checked, select the layer that has the channel to use for scaling. This is generally the same has the input layer. So re-select the input layer here. The reason you have to re-select the layer is that you could create stacked profiles from a sub-set (selection) of the input layer and want to scale over the entire layer's data. Default: unused.
-* <b>Scaling channel</b>: If the previous option is checked, then select the channel to exctract the information from. Default: unused.<br/>
+* <b>Scaling channel</b>: If the previous option is checked, then select the channel to exctract the information from. Default: unused.
+* <b>Number of worker processes</b>: Everything computed for a block of lines after reading it (filter, gaps, profiles of every variant, wiggle fill, decimation, output geometries) can be computed on several processes (cores) in parallel; reading the layer and writing the output stay in the QGIS process. Only pays on a machine with a free core per worker, and more so with several variants, wiggle fill, a median or low-pass filter or decimation (bench/bench_parallel.py measures it). Only used for blocks of lines of at least one million points; the workers are started once per run. If they cannot be started or fail, profiles are computed in the QGIS process and a message is logged. 0 or 1: everything is computed in the QGIS process. Default: 0.
+* <b>Out-of-core mode?</b>: For surveys larger than the available memory. Lines are spilled to a binary scratch file in the Processing temporary folder and read back through a memory map, so that memory use is bounded by the largest line. Slower than the default in-memory mode. Default: False.
+* <b>Cache lines?</b>: Save the lines read from the layer (grouped and sorted by fiducial) and their statistics in sidecar files (*.stackp.bin and *.stackp.npz) next to the layer, or in the Processing temporary folder. Re-runs with different display parameters (scale, offset, reverse, join) then skip reading the layer. The cache is rebuilt automatically when the layer, its filter, the selection, the fields or the dummy value change. Only layers stored in a file (GeoPackage, shapefile...) are cached: the cache is not used for memory, database or web service layers. Default: False.
+* <b>Parameter sweep</b>: To compare several profile scales, offsets and directions from a single read of the layer, give a list of variants separated by semicolons, each variant being: scale,offset[,reverse]. E.g. "0.3,0; 0.5,100; 0.5,100,1". Profile scale, offset and reverse parameters above are then ignored and the output gets 4 more fields: Variant (1, 2, ...), Scale, Offset and Reverse (0 or 1). Filter the output on Variant to display a given variant. Default: empty (no sweep).
+* <b>Data range used for scaling</b>: Min/Max (default) scales profiles on the full data range: a single spike then flattens every profile. Percentiles scales them on the range between the low and high percentiles below, which ignores spikes. Percentiles are estimated with a streaming quantile sketch while the layer is read: no extra pass over the data.
+* <b>Low percentile</b>: Low percentile of the data range when scaling on percentiles. Default: 2.
+* <b>High percentile</b>: High percentile of the data range when scaling on percentiles. Default: 98.
+* <b>Profile simplification tolerance</b>: Decimate the profiles (Douglas-Peucker) so that no dropped vertex is further than that distance, in map units, from the simplified profile. First and last points are always kept. Most vertices of large surveys are invisible at survey scale: a tolerance of about one pixel at the printing scale makes the output layer much smaller and faster to draw. NbPts is then the number of points kept. 0: no simplification. Default: 0.
+* <b>Split profiles at gaps?</b>: By default dummy values are dropped and profiles are drawn straight across the gaps. Check this option to break the profiles at dummy values and at the jumps defined below: the output is then a MultiLineStringM layer, one part per segment of data. Parts of a single point are dropped. Default: False.
+* <b>Max. fiducial step inside a profile</b>: If splitting at gaps, a fiducial step larger than that between consecutive points also starts a new part. 0: unused. Default: 0.
+* <b>Max. distance between points of a profile</b>: If splitting at gaps, a distance (map units) larger than that between consecutive points of the line also starts a new part. 0: unused. Default: 0.
+* <b>Wiggle fill of anomalies</b>: If the wiggle fill output is set, fill the anomalies above (Positive), below (Negative) or both sides of the threshold below. Default: Positive.
+* <b>Wiggle fill threshold</b>: Data value, relative to the data mean, of the base line of the wiggle fill polygons. Default: 0 (data mean).
+* <b>Output: wiggle fill polygons</b>: Optional polygon layer of the classic filled "wiggle trace": polygons between each profile and its base line where the data are above (or below) the threshold. Crossings of the base line are interpolated linearly and polygons break at dummy values (when splitting at gaps). One MultiPolygon per line and sign, with fields Line, Sign (+ or -) and, if relevant, Channel and Variant. Default: not created.
+* <b>Output: direct bulk write to GeoPackage/FlatGeobuf file</b>: For large outputs, write the stacked profiles straight to a GeoPackage (*.gpkg) or FlatGeobuf (*.fgb) file through OGR instead of the output above (which is then not created). GeoPackage features are inserted in large transactions and the spatial index is built once, after loading; FlatGeobuf builds its index when the file is closed. The file is overwritten if it exists and loaded in the project at the end. Requires the GDAL python bindings (shipped with QGIS). Default: not used.
+* <b>Incremental</b>: With a direct GeoPackage output, only re-write the lines that changed since the previous run, e.g. when a new flight is added to the compilation. A content hash of every line (coordinates, fiducials, data, type and direction) is kept in a sidecar file (*.stackp.json) next to the output; new and changed lines are re-written, lines gone are deleted, the others are left untouched. Everything shared by all lines (fields, scaling, display parameters...) is checked too: if it changed, or if the output file was modified since, all lines are re-written. Note that the scaling depends on the statistics of the whole survey: scale relative to a fixed scaling layer (see above) to keep it from changing with every new flight. Default: False.
+* <b>Along-line filter of the data</b>: Filter noisy channels along each line (sorted by fiducial) before scaling, in the same run: no need to write and re-read a filtered copy of the layer. Running mean, running median (removes spikes shorter than half the window) or FFT low-pass (zero phase, Butterworth response of order 4, lines detrended end to end). Filters never cross line ends and dummy values stay dummy. Statistics and scaling are then those of the filtered data, and M values of the output are filtered values. Default: None.
+* <b>Filter window or low-pass cut-off wavelength</b>: Window length of the running filters, or cut-off wavelength of the low-pass filter, in number of points. Default: 5.
+* <b>Compact mode</b>: For very large surveys, keep the points in memory as single precision offsets from the first point of each line, single precision data and 32-bit fiducials: about half the memory of the default double precision store. Coordinates are restored in double precision, a block of lines at a time, for the profile computations and the output, so projected coordinates of millions of metres lose nothing at survey scale (float32 offsets are exact to a few millimetres over tens of kilometres). Lines spanning more than 2^31 fiducials are rejected. Can be combined with out-of-core processing. Default: False.
+* <b>Write timing report</b>: The wall time and points processed per second of every phase of the run (read, geometry, filter, scaling, output, profile, write) and the peak memory (RSS) of the process at the end of each phase are always listed in the log at the end of the run. Check this option to also write them, with the size of the job and the main options, to a JSON file next to the output (<output>.timing.json; in the temporary folder for a temporary output), to compare versions and datasets. The peak memory of the process never goes down: a phase only shows the memory it used when it raises the peak. Default: False.<br/>
 
 <b>Results</b>
-Resulting line vector (LineM geometry) has the following fields:
+Resulting line vector (LineM geometry, MultiLineM when splitting at gaps) has the following fields:
 - <i><b>Line</b></i>: storing the original line number. Its coordinates are derived from the data channel used.
 - <i><b>Type</b></i>: line type, either L or T for line and tie-line, respectively.
 - <i><b>NbPts</b></i>: number of points in the profile.
 - <i><b>Azimuth</b></i>: azimuth of the line. Positive clockwise from North.
 - <i><b>DistEP</b></i>: distance between end points of the line.
 - <i><b>Length</b></i>: length of the line (&ge; DistEP).
+- <i><b>Channel</b></i>: name of the data field of the profile (only when several data fields are selected).
 - Coordinates: X,Y,M where M is data value.
 """
 
@@ -72,7 +93,11 @@ help_bcDispGeom = """
 help_bcGeneS = """Generate dummy survey data with spikes
 Survey consists of x many lines of any orientation and y many tie lines perpendicular to the lines.
 Data is a periodic signal between -1. and 1. which has noise and spikes added to it.
-Noise is also introduced into the X- and Y-coords of lines and tie lines.
+Noise is also introduced into the X- and Y-coords of lines and tie lines.<br/>
+
+* <b>Spike rate</b>: Percentage of the points of the lines that are spikes, half positive, half negative. 0: no spikes. Default: 0.768.
+* <b>Spike classes</b>: Amplitudes of the spikes, in base levels, with their relative weights: 'amplitude:weight, amplitude:weight, ...'. Default: 2:5.18, 2.8146:1, 3.7528:1, 6:0.5 (mostly small spikes, as in previous versions). Large test sets for despiking filters can be generated with higher rates and amplitudes.
+* <b>Random seed</b>: Any positive number generates the same survey every run, for reproducible tests. Default: 0 (different survey every run).
 """
 
 ### help_bcSwapYZ
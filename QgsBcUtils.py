@@ -19,7 +19,12 @@ WARNING: code formatting does not follow pycodestyle recommendations
 import os
 import codecs
 import re
-import numpy as np
+import time
+try:
+    import numpy as np
+except ImportError:
+    # Only needed by the colour map functions: ProgressThrottle works without it
+    np = None
 from qgis.PyQt.QtGui import QColor
 from qgis.core import (QgsColorRampShader as qRS,
                        QgsSingleBandPseudoColorRenderer,
@@ -357,3 +362,62 @@ def write_qml(V, cramp, F, opacity = '1', grey = False):
     except:
         return False
 #=========================================================================================
+
+class ProgressThrottle():
+    ''' Rate-limited progress report and cancellation check of long loops.
+        Emitting a progress signal for every feature of a layer of millions of points
+        costs more than the work itself: the feedback is only updated when at least
+        every features were processed or interval seconds elapsed since the last
+        update, whichever comes first. The clock is read every stride features.
+        feedback: QgsProcessingFeedback
+        total:    number of items (features, points...) of the loop
+        start, span: progress range covered by the loop, in percent
+        every:    max. number of items between updates
+        interval: max. time between updates, in seconds
+        stride:   number of items between two readings of the clock
+
+        Usage, per item or per chunk of n items:
+            progress = ProgressThrottle(feedback, count, 0., 60.)
+            for chunk in chunks:
+                if progress.step(len(chunk)):
+                    break           # canceled
+    '''
+    #
+    def __init__(self, feedback, total, start=0., span=100., every=100000,
+                 interval=0.2, stride=1000):
+        self.feedback = feedback
+        self.start    = start
+        self.scale    = span / total if total else 0.
+        self.every    = max(1, int(every))
+        self.interval = interval
+        self.stride   = max(1, min(int(stride), self.every))
+        self.count    = 0
+        self.canceled = feedback.isCanceled()
+        self._last    = 0
+        self._next    = self.stride
+        self._time    = time.monotonic()
+    #-------------------------------------------------------------------------------------
+
+    def update(self):
+        ''' Report progress and check cancellation now. Return True if canceled. '''
+        #
+        self.feedback.setProgress(int(self.start + self.count * self.scale))
+        self.canceled = self.feedback.isCanceled()
+        self._last    = self.count
+        self._next    = self.count + self.stride
+        self._time    = time.monotonic()
+        return self.canceled
+    #-------------------------------------------------------------------------------------
+
+    def step(self, n=1):
+        ''' Count n more items processed, update if due. Return True if canceled. '''
+        #
+        self.count += n
+        if self.count < self._next:
+            return self.canceled
+        if (self.count - self._last >= self.every or
+            time.monotonic() - self._time >= self.interval):
+            return self.update()
+        self._next = self.count + self.stride
+        return self.canceled
+    #-------------------------------------------------------------------------------------
@@ -33,8 +33,13 @@ from math import sin, cos, radians
 try:
     import numpy as np
     is_dependencies_satisfied = True
-except:
+except ImportError:
     is_dependencies_satisfied = False
+if is_dependencies_satisfied:
+    from .stackp import SPIKE_RATE, SPIKE_CLASSES, smooth, parse_spikes, spikes
+else:
+    # Parameter defaults only: the parameters are not added without numpy
+    SPIKE_RATE, SPIKE_CLASSES = None, None
 
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtCore import QVariant
@@ -51,6 +56,7 @@ from qgis.core import (QgsProcessingAlgorithm, QgsProcessing,
                        QgsFeatureSink)
 
 from .setparams import set_param
+from .QgsBcUtils import ProgressThrottle
 from .HelpbcA import help_bcGeneS
 
 #-----------------------------------------------------------------------------------------
@@ -71,11 +77,15 @@ class bcGenRNDSurveyDataAlgorithm(QgsProcessingAlgorithm):
     ANGLE     = 'ANGLE'
     DMIN      = 'DMIN'
     DMAX      = 'DMAX'
+    SPKRATE   = 'SPKRATE'
+    SPKCLS    = 'SPKCLS'
+    SEED      = 'SEED'
     CRS       = 'CRS'
     DEP       = 'DEP'
     OUTPUT    = 'OUTPUT'
 
     _default_output = 'dummy_survey_pt'
+    _block = 200000     # max. number of points generated at once
 
     _ico = 'bcGenRNDSurveyData'
     _the_strings = {"ALGONAME":"Random Survey Data",
@@ -92,7 +102,10 @@ class bcGenRNDSurveyDataAlgorithm(QgsProcessingAlgorithm):
              "Data minimum",                                                    # 4
              "Data maximum",                                                    # 5
              "CRS of the output survey (MUST be a projected crs. NO Lat/Lon)",  # 6     
-             "Survey layer"]                                                    # 7
+             "Survey layer",                                                    # 7
+             "Spike rate (% of points)",                                        # 8
+             "Spike classes (amplitude:weight, ...; amplitude in base levels)", # 9
+             "Random seed (0: different survey every run)"]                     # 10
 
     def __init__(self):
         super().__init__()
@@ -117,6 +130,13 @@ class bcGenRNDSurveyDataAlgorithm(QgsProcessingAlgorithm):
            self.DMAX:         [6,self._pstr[5],'NumberD',
                               {'defaultValue':3e4,'minValue':-9e9,'maxValue':9e9},True],
            self.CRS:          [7,self._pstr[6],'CRS',{'defaultValue':'ProjectCrs'},True],
+           self.SPKRATE:      [101,self._pstr[8],'NumberD',
+                              {'defaultValue':SPIKE_RATE,'minValue':0.,
+                               'maxValue':100.},True],
+           self.SPKCLS:       [102,self._pstr[9],'String',
+                              {'defaultValue':SPIKE_CLASSES},True],
+           self.SEED:         [103,self._pstr[10],'NumberI',
+                              {'defaultValue':0,'minValue':0,'maxValue':2**31-1},True],
            self.OUTPUT:       [1001,self._pstr[7],'SINK',
                               {'type':QgsProcessing.TypeVectorPoint},True]
         }
@@ -146,7 +166,7 @@ class bcGenRNDSurveyDataAlgorithm(QgsProcessingAlgorithm):
 
     def _noise(self, n, dd, per):
         ''' Generae noise. 
-            n:   number of points in array
+            n:   number of points in array (or shape of the array)
             dd:  data amplitude
             per: percentage of noise over dd
     
@@ -154,38 +174,50 @@ class bcGenRNDSurveyDataAlgorithm(QgsProcessingAlgorithm):
         '''
         #
         p = dd * per / 100.
-        return p * (np.random.rand(n) - 0.5)
+        return p * (self._rng.random(n) - 0.5)
     #-------------------------------------------------------------------------------------
     
+    def _write_lines(self, sink, cline, cenrot, deg, rev):
+        ''' Rotate a block of lines and write their points to sink.
+            cline:  array (lines, points, 5) of X, Y, FID, line, data
+            cenrot, deg: centre and angle of rotation (see _rotate_line)
+            rev:    boolean array, lines to reverse
+        '''
+        #
+        shape = cline.shape
+        cline = self._rotate_line(cline.reshape(-1, 5), cenrot, deg).reshape(shape)
+        # reverse lines flown the other way (coordinates and data, not fiducials)
+        for col in (0, 1, 4):
+            cline[rev, :, col] = cline[rev, ::-1, col]
+        f = QgsFeature()
+        for x, y, fid, line, v in cline.reshape(-1, 5).tolist():
+            f.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(x, y)))
+            f.setAttributes([x, y, int(fid), str(line), v])
+            sink.addFeature(f, QgsFeatureSink.FastInsert)
+    #-------------------------------------------------------------------------------------
+
+    def _parse_spikes(self, txt):
+        ''' Parse the spike classes string (see stackp.parse_spikes).
+
+            Return: arrays of amplitudes and of probabilities (sum: 1)
+        '''
+        #
+        try:
+            return parse_spikes(txt)
+        except ValueError as err:
+            raise QgsProcessingException('%s: wrong spike class "%s"' %
+                                         (self._the_strings["ERR"], err))
+    #-------------------------------------------------------------------------------------
+
     def _spike(self, n):
-        ''' Generate spikes.
-            n: number of points in array
+        ''' Generate spikes from the spike rate and classes of the parameters
+            (self._spk_rate, self._spk_amp, self._spk_p).
+            n: number of points in array (or shape of the array)
     
-            Return: array with random spikes (+/-5, +/-10 or +/15 times base level)
+            Return: array with random spikes (+/- the class amplitudes, in base levels)
         '''
         #
-        ar = np.zeros(n, dtype=np.float32)
-        rd = np.random.rand(n)
-
-        def seed_s():
-            s = float(np.random.rand(1))
-            if s < 0.01:
-                s = 6.072
-            elif s < 0.0618:
-                s = 3.236
-            elif s < 0.985:
-                s = 0.
-            elif s < 0.995:
-                s = 4.554
-            else:
-                s = 9.708
-            return s
-
-        npo = len(ar[(rd>0.95)])
-        nne = len(ar[(rd<0.05)])
-        ar[(rd>0.95)] = [ seed_s() / 1.618 for i in range(npo)]
-        ar[(rd<0.05)] = [-seed_s() / 1.618 for i in range(nne)]
-        return ar
+        return spikes(self._rng, n, self._spk_rate, self._spk_amp, self._spk_p)
     #-------------------------------------------------------------------------------------
 
     def initAlgorithm(self, config):
@@ -226,6 +258,11 @@ class bcGenRNDSurveyDataAlgorithm(QgsProcessingAlgorithm):
         Dmax  = self.parameterAsDouble(parameters, self.DMAX, context)
         crs   = self.parameterAsCrs(parameters, self.CRS, context)
         bbox  = self.parameterAsExtent(parameters, self.EXTENT, context, crs)
+        seed  = self.parameterAsInt(parameters, self.SEED, context)
+        self._rng = np.random.default_rng(seed if seed > 0 else None)
+        self._spk_rate = self.parameterAsDouble(parameters, self.SPKRATE, context) / 100.
+        self._spk_amp, self._spk_p = self._parse_spikes(
+            self.parameterAsString(parameters, self.SPKCLS, context))
 
         xmin  = bbox.xMinimum()
         xmax  = bbox.xMaximum()
@@ -264,113 +301,64 @@ class bcGenRNDSurveyDataAlgorithm(QgsProcessingAlgorithm):
         # Data - no noise
         w  = np.linspace(-2 * np.pi, 4 * np.pi, n)
         wT = np.linspace(-6 * np.pi, 6 * np.pi, npT)
-        # Data - with noise
-        Vs = []
+        # Data - with noise: one profile per group of 10 lines, one per tie-line
         Dd = Dmax - Dmin
         d = 0.01 * (np.sin(w) + np.cos(w)) * Dd + Dmin
-        n2 = int(n/2)
-        if (n % 2) == 0:
-            off = 0
-        else:
-            off = 1
-        d += np.hstack((np.array([i/2. for i in range(n2)]), 
-                        np.array([(n2-i)/2. for i in range(n2+off)])))
-        for i in range(int(nL / 10)+1):
-            if (i % 3) == 0:
-                V = d + self._noise(n, Dd, 3.)
-                V = (V + np.roll(V,1) + np.roll(V,2) + np.roll(V,3) + np.roll(V,4)) / 5.
-                V += 0.05 * self._spike(n) * Dd
-            elif (i % 4) == 0:
-                V = d + self._noise(n, Dd, 3.)
-                V = (V + np.roll(V,1) + np.roll(V,2) + np.roll(V,3) + np.roll(V,4)) / 5.
-                V += 0.5 * self._spike(n) * Dd
-            else:
-                V = d + self._noise(n, Dd, 3.)
-                V = (V + np.roll(V,1) + np.roll(V,2) + np.roll(V,3) + np.roll(V,4)) / 5.
-                V += 0.1 * self._spike(n) * Dd
-            Vs.append(V)
-        Vs[1] = np.roll(Vs[1], 6)
-        VTs = []
-        for i in range(nT):
-            VT = 0.01*(np.sin(wT) + np.cos(wT))*Dd/3. + self._noise(npT, Dd, 50.) + Dmin
-            VT = (VT + np.roll(VT,1) + np.roll(VT,2) + np.roll(VT,3) + np.roll(VT,4)) / 5.
-            VT = (VT + np.roll(VT,1) + np.roll(VT,2) + np.roll(VT,3) + np.roll(VT,4)) / 5.
-            VT = (VT + np.roll(VT,1) + np.roll(VT,2) + np.roll(VT,3) + np.roll(VT,4)) / 5.
-            VTs.append(VT)
+        n2 = n // 2
+        d += np.r_[np.arange(n2), n2 - np.arange(n - n2)] / 2.
+        iv  = np.arange(int(nL / 10) + 1)
+        lvl = np.where(iv % 3 == 0, 0.05, np.where(iv % 4 == 0, 0.5, 0.1))
+        Vs  = smooth(d + self._noise((len(iv), n), Dd, 3.))
+        Vs += lvl[:, None] * self._spike((len(iv), n)) * Dd
+        if len(Vs) > 1:
+            Vs[1] = np.roll(Vs[1], 6)
+        VTs = 0.01 * (np.sin(wT) + np.cos(wT)) * Dd / 3. + Dmin
+        VTs = smooth(smooth(smooth(VTs + self._noise((nT, npT), Dd, 50.))))
 
         # Y-coords with noise: line offset
         y0 = y0 + self._noise(nL, dy, 10.)
         x1 = x1 + self._noise(nT, dy, 10.)
 
-        # Generate survey
-        fid = 0
-        line = 90
-        total = 90. / nL
-        f = QgsFeature()
-        for j in range(nL):
-            if feedback.isCanceled():
+        # Generate survey: blocks of whole lines, each built with array operations
+        progress = ProgressThrottle(feedback, nL * n + nT * npT)
+        c  = None
+        ji = np.arange(n)
+        for j0 in range(0, nL, max(1, self._block // n)):
+            if progress.canceled:
                 break
-
-            line += 10
-            k = int(j / 10)
-            # Add noise on point location
-            x = x0 + self._noise(n, dx, 3.)
-            if k == 0:
-                aV = np.roll(Vs[k], abs(int((j+1)**.95)))
-            elif k == 1:
-                aV = np.roll(Vs[k], -abs(int((j+1-10)**.95)))
-            else: aV = Vs[k]
-            cline = np.array([[ex, y0[j] + float(self._noise(1, dy, 3.)), fid + i + 1,
-                                                  line, aV[i]] for i, ex in enumerate(x)])
-            fid += n
-            if k == 0:
-                np.roll(Vs[k], 3)
-
-            # rotate line
-            if j == 0:
+            j = np.arange(j0, min(nL, j0 + max(1, self._block // n)))
+            k = j // 10
+            # Data of the first 20 lines shifted along the line
+            sh = np.zeros(len(j), dtype=int)
+            sh[k == 0] = ((j[k == 0] + 1) ** .95).astype(int)
+            sh[k == 1] = -((j[k == 1] + 1 - 10) ** .95).astype(int)
+            cline = np.empty((len(j), n, 5))
+            cline[..., 0] = x0 + self._noise((len(j), n), dx, 3.)
+            cline[..., 1] = y0[j, None] + self._noise((len(j), n), dy, 3.)
+            cline[..., 2] = (j * n)[:, None] + ji + 1
+            cline[..., 3] = (100 + 10 * j)[:, None]
+            cline[..., 4] = Vs[k[:, None], (ji - sh[:, None]) % n]
+            if c is None:
                 # define centre of rotation
-                c = QgsPoint(cline[0, 0], cline[0, 1])
-            cline = self._rotate_line(cline, c, angle)
-            # reverse line if odd
-            if (j % 2) == 1:
-                cline[:,0] = cline[:,0][::-1]
-                cline[:,1] = cline[:,1][::-1]
-                cline[:,4] = cline[:,4][::-1]
-            # save line
-            for pt in cline:
-                f.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(pt[0], pt[1])))
-                f.setAttributes([float(pt[0]),float(pt[1]),int(pt[2]),str(pt[3]),
-                                 float(pt[4])])
-                sink.addFeature(f, QgsFeatureSink.FastInsert)
-            feedback.setProgress(int(j * total))
+                c = QgsPoint(cline[0, 0, 0], cline[0, 0, 1])
+            self._write_lines(sink, cline, c, angle, j % 2 == 1)
+            progress.step(cline.shape[0] * n)
 
         # Tie lines
-        line = 10090
-        total = 10. / nT
-        for j in range(nT):
-            if feedback.isCanceled():
+        fid = nL * n
+        ji  = np.arange(npT)
+        for j0 in range(0, nT, max(1, self._block // npT)):
+            if progress.canceled:
                 break
-
-            line += 10
-            # Add noise on point location
-            yT = y1 + self._noise(npT, dx, 3.)
-            cline0 = np.array([[x1[j] + float(self._noise(1, dy, 3.)), ey, fid + i + 1,
-                                             line, VTs[j][i]] for i, ey in enumerate(yT)])
-            fid += nL
-            # rotate line
-            cline = self._rotate_line(cline0, c, angle)
-            # reverse line if odd
-            if (j % 2) == 1:
-                cline[:,0] = cline[:,0][::-1]
-                cline[:,1] = cline[:,1][::-1]
-                cline[:,4] = cline[:,4][::-1]
-            # save line and add to data frame
-            for pt in cline:
-                f.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(pt[0], pt[1])))
-                f.setAttributes([float(pt[0]),float(pt[1]),int(pt[2]),str(pt[3]),
-                                 float(pt[4])])
-                sink.addFeature(f, QgsFeatureSink.FastInsert)
-            feedback.setProgress(int(j * total) + 90.)
+            j = np.arange(j0, min(nT, j0 + max(1, self._block // npT)))
+            cline = np.empty((len(j), npT, 5))
+            cline[..., 0] = x1[j, None] + self._noise((len(j), npT), dy, 3.)
+            cline[..., 1] = y1 + self._noise((len(j), npT), dx, 3.)
+            cline[..., 2] = fid + (j * nL)[:, None] + ji + 1
+            cline[..., 3] = (10100 + 10 * j)[:, None]
+            cline[..., 4] = VTs[j]
+            self._write_lines(sink, cline, c, angle, j % 2 == 1)
+            progress.step(cline.shape[0] * npT)
 
         return {self.OUTPUT:dest_id}
     #-------------------------------------------------------------------------------------
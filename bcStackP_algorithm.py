@@ -29,19 +29,20 @@ __copyright__ = '(C) 2019-2023 by GeoProc.com'
 __revision__ = '$Format:%H$'
 
 import os
-import codecs
-is_dependencies_satisfied = False
-from math import sin, cos, radians, sqrt
+import uuid
 try:
     import numpy as np
-    import pandas as pd
     is_dependencies_satisfied = True
-except:
-    try:
-        os.system('"' + os.path.join(sys.prefix, 'scripts', 'pip.exe') + '" install pandas')
-    finally:
-        import pandas as pd
-        is_dependencies_satisfied = True
+except ImportError:
+    is_dependencies_satisfied = False
+if is_dependencies_satisfied:
+    # Errors in the engine itself must show, not pass for a missing numpy
+    from .stackp import LineStore, PointExtractor, StoreCache, StreamStats, QuantileSketch
+    from .stackp import line_geometry, classify_lines, parallel_block
+    from .stackp import OgrWriter, has_ogr
+    from .stackp import LineIndex, global_key, line_hashes
+    from .stackp import FILTERS, filter_lines
+    from .stackp import PhaseTimer, ProfilePool
 
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtCore import QVariant
@@ -51,17 +52,17 @@ from qgis.core import (QgsFeature,
                        QgsField,
                        QgsFields,
                        QgsGeometry,
-                       QgsLineString,
-                       QgsPoint,
                        QgsProcessing,
                        QgsProcessingAlgorithm,
+                       QgsProcessingContext,
                        QgsProcessingException,
                        QgsProcessingFeatureSource,
+                       QgsProcessingFeatureSourceDefinition,
                        QgsProcessingUtils,
-                       QgsStatisticalSummary,
                        QgsWkbTypes)
 
 from .setparams import set_param
+from .QgsBcUtils import ProgressThrottle
 from .HelpbcA import help_bcStackP
 #-----------------------------------------------------------------------------------------
 plugin_path = os.path.dirname(__file__)
@@ -90,21 +91,46 @@ class bcStackPAlgorithm(QgsProcessingAlgorithm):
     BSCALE    = 'BSCALE'
     SCALLY    = 'SCALLY'
     SCALCH    = 'SCALCH'
+    NWORKERS  = 'NWORKERS'
+    OUTOFCORE = 'OUTOFCORE'
+    USECACHE  = 'USECACHE'
+    SWEEP     = 'SWEEP'
+    SCALMODE  = 'SCALMODE'
+    PLOW      = 'PLOW'
+    PHIGH     = 'PHIGH'
+    SIMPLIFY  = 'SIMPLIFY'
+    GAPS      = 'GAPS'
+    GAPFID    = 'GAPFID'
+    GAPDIST   = 'GAPDIST'
+    FILLMODE  = 'FILLMODE'
+    FILLTHR   = 'FILLTHR'
+    FILLOUT   = 'FILLOUT'
+    OUTFILE   = 'OUTFILE'
+    INCREMENT = 'INCREMENT'
+    FILTER    = 'FILTER'
+    FILTW     = 'FILTW'
+    COMPACT   = 'COMPACT'
+    TIMING    = 'TIMING'
     DEP       = 'DEP'
 
     _default_output = 'stacked profiles_ln'
+    _block = 2000000    # max. number of points processed at once (out-of-core, compact)
+    _batch = 1000       # number of features sent at once to the sink
+    _ogr_batch = 50000  # number of features per transaction, direct file output
 
     _ico = 'bcStackP'
     _the_strings = {"ERR":"ERROR",
-                    "ERR_DEP":"numpy and pandas are required to run this algorithm",
-                    "DEP_LST":"numpy, pandas",
+                    "ERR_DEP":"numpy is required to run this algorithm",
+                    "DEP_LST":"numpy",
                     "ERR_VECTOR":"ERROR: Input is not a vector!",
+                    "ERR_OGR":"GDAL/OGR python bindings required for direct file output",
+                    "ERR_INC":"Incremental mode needs a direct GeoPackage output file",
                     "ALGONAME":"Stacked profiles from point layer"
                    }
 
     _pstr = ['Input vector (point layers only. NO multipoint or otherwise)', #  0
              'Fiducial field (monotonically increasing number)',             #  1
-             'Data field (numeric)',                                         #  2
+             'Data field(s) (numeric)',                                      #  2
              'Line field',                                                   #  3
              'Dummy (N/A) value',                                            #  4
              'Reverse profiles?',                                            #  5
@@ -115,7 +141,32 @@ class bcStackPAlgorithm(QgsProcessingAlgorithm):
              'Scaling layer',                                                # 10
              'Scaling channel',                                              # 11
              'Output: Stacked profile vector file',                          # 12
-             'Output line vector file']                                      # 13
+             'Output line vector file',                                      # 13
+             'Number of worker processes for profiles (0: no parallelism)',  # 14
+             'Out-of-core mode (survey larger than memory)?',                # 15
+             'Cache lines read from the layer for faster re-runs?',          # 16
+             'Parameter sweep: scale,offset,reverse;... (empty: no sweep)',  # 17
+             'Data range used for scaling',                                  # 18
+             'Low percentile (percentiles scaling)',                         # 19
+             'High percentile (percentiles scaling)',                        # 20
+             'Profile simplification tolerance (map units, 0: none)',        # 21
+             'Split profiles at gaps (dummy values, jumps)?',                # 22
+             'Max. fiducial step inside a profile (0: unused)',              # 23
+             'Max. distance between points of a profile (0: unused)',        # 24
+             'Output: wiggle fill polygons',                                 # 25
+             'Wiggle fill of anomalies',                                     # 26
+             'Wiggle fill threshold (data units, relative to data mean)',    # 27
+             'Output: direct bulk write to GeoPackage/FlatGeobuf file',      # 28
+             'GeoPackage (*.gpkg);;FlatGeobuf (*.fgb)',                      # 29
+             'Incremental: re-write only changed lines of the GeoPackage?',  # 30
+             'Along-line filter of the data',                                # 31
+             'Filter window or low-pass cut-off wavelength (points)',        # 32
+             'Compact mode (float32 coordinates from a local origin)?',      # 33
+             'Write timing report (JSON) next to the output?']               # 34
+
+    _scal_lst = ['Min/Max', 'Percentiles']
+    _fill_lst = ['Positive', 'Negative', 'Positive and negative']
+    _filt_lst = ['None', 'Running mean', 'Running median (despike)', 'FFT low-pass']
 
     def __init__(self):
         super().__init__()
@@ -132,7 +183,8 @@ class bcStackPAlgorithm(QgsProcessingAlgorithm):
                             {'types':[QgsProcessing.TypeVectorPoint]},False],
            self.FID_FLD:   [2,self._pstr[1],'Field',{'parent':self.THE_LAYER},False],
            self.LINE_FLD:  [3,self._pstr[3],'Field',{'parent':self.THE_LAYER},False],
-           self.DATA_FLD:  [4,self._pstr[2],'Field',{'parent':self.THE_LAYER},False],
+           self.DATA_FLD:  [4,self._pstr[2],'Field',
+                            {'parent':self.THE_LAYER,'allowMultiple':True},False],
            self.DUMVAL:    [5,self._pstr[4],'NumberD',
                             {'defaultValue':9999.,'minValue':-1e5,'maxValue':1e5},True],
            self.INVERTP:   [6,self._pstr[5],'Bool',{'defaultValue':False},True],
@@ -145,9 +197,43 @@ class bcStackPAlgorithm(QgsProcessingAlgorithm):
            self.SCALLY:    [110,self._pstr[10],'VectorLayer',
                             {'types':[QgsProcessing.TypeVectorPoint]},True],
            self.SCALCH:    [111,self._pstr[11],'Field',{'parent':self.THE_LAYER},True],
+           self.NWORKERS:  [112,self._pstr[14],'NumberI',
+                            {'defaultValue':0,'minValue':0,'maxValue':256},True],
+           self.OUTOFCORE: [113,self._pstr[15],'Bool',{'defaultValue':False},True],
+           self.USECACHE:  [114,self._pstr[16],'Bool',{'defaultValue':False},True],
+           self.SWEEP:     [115,self._pstr[17],'String',{'defaultValue':''},True],
+           self.SCALMODE:  [116,self._pstr[18],'Enum',
+                            {'list':self._scal_lst,'defaultValue':0},True],
+           self.PLOW:      [117,self._pstr[19],'NumberD',
+                            {'defaultValue':2.,'minValue':0.,'maxValue':50.},True],
+           self.PHIGH:     [118,self._pstr[20],'NumberD',
+                            {'defaultValue':98.,'minValue':50.,'maxValue':100.},True],
+           self.SIMPLIFY:  [119,self._pstr[21],'NumberD',
+                            {'defaultValue':0.,'minValue':0.,'maxValue':1e6},True],
+           self.GAPS:      [120,self._pstr[22],'Bool',{'defaultValue':False},True],
+           self.GAPFID:    [121,self._pstr[23],'NumberD',
+                            {'defaultValue':0.,'minValue':0.,'maxValue':1e9},True],
+           self.GAPDIST:   [122,self._pstr[24],'NumberD',
+                            {'defaultValue':0.,'minValue':0.,'maxValue':1e9},True],
+           self.FILLMODE:  [123,self._pstr[26],'Enum',
+                            {'list':self._fill_lst,'defaultValue':0},True],
+           self.FILLTHR:   [124,self._pstr[27],'NumberD',
+                            {'defaultValue':0.,'minValue':-1e9,'maxValue':1e9},True],
+           self.INCREMENT: [125,self._pstr[30],'Bool',{'defaultValue':False},True],
+           self.FILTER:    [126,self._pstr[31],'Enum',
+                            {'list':self._filt_lst,'defaultValue':0},True],
+           self.FILTW:     [127,self._pstr[32],'NumberI',
+                            {'defaultValue':5,'minValue':2,'maxValue':100000},True],
+           self.COMPACT:   [128,self._pstr[33],'Bool',{'defaultValue':False},True],
+           self.TIMING:    [129,self._pstr[34],'Bool',{'defaultValue':False},True],
            self.OUTPUT:    [1001,self._pstr[12],'SINK',
                             {'type':QgsProcessing.TypeVectorLine,
-                             'defaultValue':self._default_output},True]
+                             'defaultValue':self._default_output},True],
+           self.FILLOUT:   [1002,self._pstr[25],'SINK',
+                            {'type':QgsProcessing.TypeVectorPolygon,
+                             'createByDefault':False},True],
+           self.OUTFILE:   [1003,self._pstr[28],'FileDestination',
+                            {'FILTER':self._pstr[29],'createByDefault':False},True]
         }
         self._err_param = {self.DEP: [1,self._the_strings["ERR_DEP"],'String',
                            {'defaultValue':self._the_strings["DEP_LST"]},False]}
@@ -176,79 +262,122 @@ class bcStackPAlgorithm(QgsProcessingAlgorithm):
 
         self.tmpDir  = QgsProcessingUtils.tempFolder()
         self._error  = ''
-        self.azi     = None
-        self.aziT    = None
-        self.type    = 'L'
-        self.azimut  = None
-        self.length  = 0.
-        self.clength = 0.
     #-------------------------------------------------------------------------------------
 
-    def _do_profile(self, ar, inv, scale, offset):
-        ''' Create profile for current line.
-            ar: current line (pandas DataFrame)
-            inv: 1 (default) or -1 to reverse profile
-            scale: scale profile relative to max-profile length
-            offset: move profile relative to line trace
+    def _parse_sweep(self, sweep):
+        ''' Parse the parameter sweep string: 'scale,offset,reverse; scale,offset,...'
+            reverse is optional (0/1, true/false, yes/no). Default: no reverse.
 
-            Return: 2 numpy arrays: X and new-Y = profile coordinates
+            Return: list of (scale, offset, 1 or -1)
         '''
         #
-        nar = np.array(ar[['X','Y']])
-        line_pts = [QgsPoint(x,y) for x,y in nar]
-
-        # Rotate line to horizontal
-        aziN   = line_pts[0].azimuth(line_pts[-1]) # angle positive clockwise from North
-        azi    = 90. -aziN                         # angle +'ve CCW from East
-        cx, cy = nar[0, 0], nar[0, 1]              # center of rotation
-
-        # Rotate line to horizontal    
-        theta  = radians(-azi)
-        co, si = cos(theta), sin(theta)
-        tx, ty = nar[:,0] - cx, nar[:,1] - cy
-        px = tx * co - ty * si + cx
-        py = tx * si + ty * co + cy
-
-        # Take care of profile direction and line vs tie-line
-        bT = False
-        self.type = 'L'
-        if self.azi != None and abs(int(azi) - self.azi) > 20:
-            if ((azi > self.azi and abs(int(azi) - (self.azi +180)) < 20) or
-                (azi < self.azi and abs(int(azi) - (self.azi -180)) < 20)):
-                inv = -inv
-            elif self.aziT == None:
-                # first tie line
-                self.aziT = int(azi)
-                bT = True
-            if self.aziT != None and abs(int(azi) - self.aziT) > 20:
-                if ((azi > self.aziT and abs(int(azi) - (self.aziT +180)) < 20) or
-                    (azi < self.aziT and abs(int(azi) - (self.aziT -180)) < 20)):
-                    inv = -inv
-                    bT = True
-            elif self.aziT != None and abs(int(azi) - self.aziT) <= 20:
-                    bT =True
-        if bT:
-            inv = -inv
-            self.type = 'T'
-        # Change Y-coords to scaled data
-        mn = py.mean()  # average Y-coord
-        ar['Yb'] = inv * (scale * (ar.Data - self.dmean) * self.mult + offset) + mn
-
-        # Rotate line back to original angle
-        theta  = radians(azi)
-        co, si = cos(theta), sin(theta)
-        tx, ty = px - cx, np.array(ar.Yb) - cy
-        px1 = tx * co - ty * si + cx   # New X-coords
-        py1 = tx * si + ty * co + cy   # New Y-coords
+        variants = []
+        for the_var in sweep.replace('\n', ';').split(';'):
+            if the_var.strip() == '':
+                continue
+            vals = [v.strip() for v in the_var.split(',')]
+            try:
+                if len(vals) not in (2, 3):
+                    raise ValueError
+                sc, of = float(vals[0]), float(vals[1])
+                rev = len(vals) == 3 and vals[2].lower() in ('1', 'true', 'yes', 'y')
+            except ValueError:
+                raise QgsProcessingException('%s: wrong parameter sweep "%s"' %
+                                             (self._the_strings["ERR"], the_var.strip()))
+            variants.append((sc, of, -1 if rev else 1))
+        return variants
+    #-------------------------------------------------------------------------------------
+
+    def _read_lines(self, the_layer, ix, dumval, spill, feedback, keep_dummy=False,
+                    compact=False):
+        ''' Read all points of the_layer in a line store, in a single pass over the
+            features. Coordinates and fiducials are stored once, with one data
+            column per data channel.
+            ix:     indices of the line and fiducial fields, then of the data fields
+            dumval: dummy value, set to NaN in its channel; points dummy in all
+                    channels are skipped
+            spill:  scratch file for out-of-core mode (None: in memory)
+            keep_dummy: if True, points dummy in all channels are kept too (to
+                        split profiles at gaps)
+            compact: if True, compact line store (float32 offsets from line origins)
+
+            Return: finalized LineStore, lists of StreamStats and QuantileSketch (one
+                    item per data channel)
+        '''
         #
-        self.azimut = aziN
-        self.length = line_pts[0].distance(line_pts[-1])
-        self.clength = np.array([line_pts[i].distance(line_pts[i+1]) 
-                                                   for i in range(len(line_pts)-1)]).sum()
+        # Get the features and fields of interest
+        features = the_layer.getFeatures(QgsFeatureRequest().setSubsetOfAttributes(ix),
+                       QgsProcessingFeatureSource.FlagSkipGeometryValidityChecks)
+        nch      = len(ix) - 2
+        store    = LineStore(spill, 2 * self._block, compact, nch)
+        stats    = [StreamStats() for k in range(nch)]
+        sketches = [QuantileSketch() for k in range(nch)]
+        # Progress (0 to 60%) and cancellation checked every 100000 features or 0.2 s
+        progress = ProgressThrottle(feedback, max(0, the_layer.featureCount()), 0., 60.)
+        reader   = PointExtractor(features, ix, [None, np.int64] + [np.float64] * nch)
+        for x, y, cols in reader:
+            if progress.step(reader.count - progress.count):
+                break
+            lid, fid = cols[0], cols[1]
+            dat = np.column_stack(cols[2:]) if nch > 1 else cols[2]
+            # Dummy (or NULL) values: NaN in their channel
+            ok  = np.abs(dat - dumval) >= 1e-6
+            for k in range(nch):
+                okk = ok[:, k] if nch > 1 else ok
+                col = dat[:, k] if nch > 1 else dat
+                stats[k].update(col[okk])
+                sketches[k].update(col[okk])
+            dat = np.where(ok, dat, np.nan)
+            if not keep_dummy:
+                keep = ok.any(axis=1) if nch > 1 else ok
+                lid, x, y, fid, dat = lid[keep], x[keep], y[keep], fid[keep], dat[keep]
+            # Points are dispatched to their line, whatever the order of the features
+            store.append(lid, x, y, fid, dat)
+        # Group lines and sort them by fiducial
+        store.finalize()
+        return store, stats, sketches
+    #-------------------------------------------------------------------------------------
+
+    def _write(self, out, batch):
+        ''' Write a batch of (WKB, attributes) to out: a feature sink or an OgrWriter. '''
         #
-        if self.azi == None:
-            self.azi = int(azi)
-        return px1, py1  # profile coords
+        if isinstance(out, OgrWriter):
+            out.add_features(batch)
+            return
+        feats = []
+        for wkb, attrs in batch:
+            f = QgsFeature()
+            f.setAttributes(attrs)
+            geom = QgsGeometry()
+            geom.fromWkb(wkb)
+            f.setGeometry(geom)
+            feats.append(f)
+        out.addFeatures(feats, QgsFeatureSink.FastInsert)
+    #-------------------------------------------------------------------------------------
+
+    def _timing_file(self, dest):
+        ''' Timing report file next to the output dest, in the temporary folder if
+            the output is not a file (e.g. temporary layer).
+        '''
+        #
+        path = str(dest).split('|')[0]
+        if os.path.isabs(path) and os.path.isdir(os.path.dirname(path)):
+            return os.path.splitext(path)[0] + '.timing.json'
+        return os.path.join(self.tmpDir, 'bcStackP.timing.json')
+    #-------------------------------------------------------------------------------------
+
+    def _data_range(self, stats, sketch, pct):
+        ''' Return the data range (low, high) used for scaling.
+            pct: None for min/max, else (low, high) percentiles
+        '''
+        #
+        if pct is None:
+            return stats.min, stats.max
+        lo, hi = sketch.quantiles([pct[0] / 100., pct[1] / 100.])
+        if not hi > lo:
+            # Flat data between percentiles: fall back to min/max
+            return stats.min, stats.max
+        return lo, hi
     #-------------------------------------------------------------------------------------
 
     def processAlgorithm(self, parameters, context, feedback):
@@ -258,6 +387,7 @@ class bcStackPAlgorithm(QgsProcessingAlgorithm):
             return {}
 
 # Init
+        timer = PhaseTimer()
         # The number of features in the input layer could be trimmed to user selection.
         the_layer = self.parameterAsSource(parameters, self.THE_LAYER, context)
         gok = QgsWkbTypes.geometryType(the_layer.wkbType()) == QgsWkbTypes.PointGeometry
@@ -273,27 +403,57 @@ class bcStackPAlgorithm(QgsProcessingAlgorithm):
                 raise QgsProcessingException(self.invalidSourceError(parameters,
                                                                      self.SCALLY))
         fidu_fld     = self.parameterAsString(parameters, self.FID_FLD, context)
-        data_fld     = self.parameterAsString(parameters, self.DATA_FLD, context)
+        data_flds    = self.parameterAsFields(parameters, self.DATA_FLD, context)
         line_fld     = self.parameterAsString(parameters, self.LINE_FLD, context)
         invP         = self.parameterAsBool(parameters,   self.INVERTP, context)
         dumval       = self.parameterAsDouble(parameters, self.DUMVAL, context)
         scale        = self.parameterAsDouble(parameters, self.SCALE, context)
         offset       = self.parameterAsDouble(parameters, self.OFFSET, context)
         join_to_line = self.parameterAsBool(parameters,   self.JOINL, context)
+        nworkers     = self.parameterAsInt(parameters,    self.NWORKERS, context)
+        bOOC         = self.parameterAsBool(parameters,   self.OUTOFCORE, context)
+        bCompact     = self.parameterAsBool(parameters,   self.COMPACT, context)
+        bTiming      = self.parameterAsBool(parameters,   self.TIMING, context)
+        bCache       = self.parameterAsBool(parameters,   self.USECACHE, context)
+        sweep        = self.parameterAsString(parameters, self.SWEEP, context)
+        tol          = self.parameterAsDouble(parameters, self.SIMPLIFY, context)
+        bGaps        = self.parameterAsBool(parameters,   self.GAPS, context)
+        fid_gap      = self.parameterAsDouble(parameters, self.GAPFID, context)
+        dist_gap     = self.parameterAsDouble(parameters, self.GAPDIST, context)
+        fill_signs   = [[1], [-1], [1, -1]][self.parameterAsInt(parameters, self.FILLMODE,
+                                                               context)]
+        fill_thr     = self.parameterAsDouble(parameters, self.FILLTHR, context)
+        bIncr        = self.parameterAsBool(parameters,   self.INCREMENT, context)
+        fkind        = FILTERS[self.parameterAsInt(parameters, self.FILTER, context)]
+        fwidth       = self.parameterAsInt(parameters,    self.FILTW, context)
+        if self.parameterAsInt(parameters, self.SCALMODE, context) == 1:
+            pct = (self.parameterAsDouble(parameters, self.PLOW, context),
+                   self.parameterAsDouble(parameters, self.PHIGH, context))
+        else:
+            pct = None
+
+        # Variants of (scale, offset, reverse): one, or several in sweep mode
+        variants = self._parse_sweep(sweep)
+        bSweep   = len(variants) > 0
+        if not bSweep:
+            variants = [(scale, offset, -1 if invP else 1)]
 
-        data = the_layer.fields().at(the_layer.fields().lookupField(data_fld))
+        # Data channels: all read in a single pass over the layer
+        data_ix = [the_layer.fields().lookupField(d) for d in data_flds]
         fidu = the_layer.fields().at(the_layer.fields().lookupField(fidu_fld))
-        if not data.isNumeric() or not fidu.isNumeric():
+        if (len(data_ix) == 0 or not fidu.isNumeric() or
+            not all(the_layer.fields().at(i).isNumeric() for i in data_ix)):
             raise QgsProcessingException(self.invalidSourceError(parameters,
                                                              self.THE_LAYER))
+        nch     = len(data_ix)
+        bMulti  = nch > 1
 
-        line = the_layer.fields().at(the_layer.fields().lookupField(line_fld))
-        data_ix = the_layer.fields().lookupField(data_fld)
         line_ix = the_layer.fields().lookupField(line_fld)
         fidu_ix = the_layer.fields().lookupField(fidu_fld)
 
         # Set output vector layer: point(X, Y, M) M is data value at that point
-        output_wkb = QgsWkbTypes.LineString
+        # One part per segment between gaps when splitting at gaps
+        output_wkb = QgsWkbTypes.MultiLineString if bGaps else QgsWkbTypes.LineString
         output_wkb = QgsWkbTypes.addM(output_wkb)
 
         # Fields of stacked profiles vector
@@ -307,158 +467,360 @@ class bcStackPAlgorithm(QgsProcessingAlgorithm):
             fields.append(QgsField('Azimuth', QVariant.Double, '', 10, 6))
             fields.append(QgsField('DistEP', QVariant.Double, '', 10, 2))
             fields.append(QgsField('Length', QVariant.Double, '', 10, 2))
-        (sink, dest_id) = self.parameterAsSink(parameters, self.OUTPUT, context, fields,
-                                               output_wkb, the_layer.sourceCrs())
-        if sink is None:
-            raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT))
-
-        # Get the features and fields of interest
-        features = the_layer.getFeatures(QgsFeatureRequest().setSubsetOfAttributes(
-                       [fidu_ix, line_ix, data_ix]), 
-                       QgsProcessingFeatureSource.FlagSkipGeometryValidityChecks)
-
-# CSV
-        # Find min/max of data values for all lines and save each line in a csv file
-        # Then process each line separately: can have any number of lines...
-        lines = []
-        xyzf  = []
-        lineN = ''
-        nL    = 0
-        TL    = 0.
-        total = 60.0 / the_layer.featureCount() if the_layer.featureCount() else 0
-        stat  = QgsStatisticalSummary()
-        for current, ft in enumerate(features):
-            if feedback.isCanceled():
-                break
-            feedback.setProgress(int(current * total))
-            if not ft.hasGeometry():
-                continue
-            #
-            if ft[line.name()] != lineN:
-                if xyzf != []:
-                    lines.append([lineN, nL])
-                    the_csv = os.path.join(self.tmpDir, '%s.csv' % str(lineN))
-                    with codecs.open(the_csv, 'w', 'utf-8') as fo:
-                        fo.write('X,Y,FID,Data\n')
-                        for ar in xyzf:
-                            fo.write(','.join(map(str, ar)))
-                            fo.write('\n')
-                    le = sqrt((xyzf[0][0] - xyzf[-1][0])**2 + 
-                              (xyzf[0][1] - xyzf[-1][1])**2)
-                    if le > TL:
-                        TL = le
-                    xyzf = []
-                    nL = 0
-                lineN = ft[line.name()]
-            #
-            rdata = float(ft[data.name()])
-            fiduu = int(ft[fidu.name()])
-            if abs(rdata - dumval) < 1e-6:
-                # Dummy value: skip
-                continue
-            #
-            stat.addVariant(ft[data.name()])
-            # how to handle QgsMultiPoint ???
-            if (the_layer.wkbType() == QgsWkbTypes.MultiPoint or
-                the_layer.wkbType() == QgsWkbTypes.MultiPointM or
-                the_layer.wkbType() == QgsWkbTypes.MultiPointZ or
-                the_layer.wkbType() == QgsWkbTypes.MultiPointZM or
-                the_layer.wkbType() == QgsWkbTypes.MultiPoint25D):
-                # Suppose they all have the same attributes:
-                #  in this case it seems useless to get more than the first point, but...
-                points = ft.geometry().constGet().clone()
-            else:
-                points = [ft.geometry().constGet().clone()]
+            if bMulti:
+                fields.append(QgsField('Channel', QVariant.String, '', 32))
+            if bSweep:
+                fields.append(QgsField('Variant', QVariant.Int, '', 4, 0))
+                fields.append(QgsField('Scale', QVariant.Double, '', 12, 6))
+                fields.append(QgsField('Offset', QVariant.Double, '', 12, 2))
+                fields.append(QgsField('Reverse', QVariant.Int, '', 2, 0))
+        outfile = self.parameterAsFileOutput(parameters, self.OUTFILE, context)
+        if bIncr and not outfile.lower().endswith('.gpkg'):
+            raise QgsProcessingException('%s: %s' % (self._the_strings["ERR"],
+                                                      self._the_strings["ERR_INC"]))
+        if outfile:
+            # Direct bulk write through OGR, in place of the feature sink. The file is
+            # opened once the data are read: incremental mode needs their scaling
+            if not has_ogr:
+                raise QgsProcessingException('%s: %s' % (self._the_strings["ERR"],
+                                                          self._the_strings["ERR_OGR"]))
+            lname = os.path.splitext(os.path.basename(outfile))[0]
+            kinds = {QVariant.String:'String', QVariant.Int:'Integer'}
+            ofields = [(f.name(), kinds.get(f.type(), 'Real'), f.length(), f.precision())
+                       for f in fields]
+            sink, dest_id = None, outfile
+            results = {self.OUTPUT:dest_id, self.OUTFILE:outfile}
+        else:
+            (sink, dest_id) = self.parameterAsSink(parameters, self.OUTPUT, context,
+                                                   fields, output_wkb,
+                                                   the_layer.sourceCrs())
+            if sink is None:
+                raise QgsProcessingException(self.invalidSinkError(parameters,
+                                                                   self.OUTPUT))
+            results = {self.OUTPUT:dest_id}
+
+        # Optional wiggle fill polygons: one multipolygon per line and sign
+        ffields = QgsFields()
+        ffields.append(QgsField('Line', QVariant.String, '', 16))
+        ffields.append(QgsField('Sign', QVariant.String, '', 1))
+        if bMulti:
+            ffields.append(QgsField('Channel', QVariant.String, '', 32))
+        if bSweep:
+            ffields.append(QgsField('Variant', QVariant.Int, '', 4, 0))
+        (fsink, fill_id) = self.parameterAsSink(parameters, self.FILLOUT, context, ffields,
+                                                QgsWkbTypes.MultiPolygon,
+                                                the_layer.sourceCrs())
+        if fsink is not None:
+            results[self.FILLOUT] = fill_id
+
+# Read
+        # Read all lines, chunk by chunk, in memory or in a scratch file (out-of-core)
+        # Then process lines by blocks: can have any number of lines...
+        # One store for all channels: coordinates read and stored once, dummies are
+        # NaN in their channel
+        if bOOC:
+            spill   = os.path.join(self.tmpDir, 'bcStackP_%s.bin' % uuid.uuid4().hex)
+            max_pts = self._block
+        else:
+            spill, max_pts = None, None
+        if bCompact:
+            # Compact stores are expanded to float64 one block of lines at a time
+            max_pts = self._block
+        store, stats, sketches, cache = None, None, None, None
+        timer.start('read')
+        if bCache:
+            # Re-use the lines of a previous run if the layer did not change
+            layer = self.parameterAsVectorLayer(parameters, self.THE_LAYER, context)
+            if layer is not None:
+                extra = [dumval, layer.subsetString(), the_layer.featureCount()]
+                the_def = parameters[self.THE_LAYER]
+                if isinstance(the_def, QgsProcessingFeatureSourceDefinition):
+                    if the_def.selectedFeaturesOnly:
+                        extra.append(sorted(layer.selectedFeatureIds()))
+                    # Feature filter and limit of the input (filterExpression: 3.32+)
+                    extra += [getattr(the_def, 'filterExpression', ''),
+                              the_def.featureLimit]
+                if bGaps:
+                    # Dummy points are kept in the lines
+                    extra.append('gaps')
+                if bCompact:
+                    # Coordinates rounded to float32 offsets: not those of a full run
+                    extra.append('compact')
+                cache = StoreCache(layer.source(), [line_fld, fidu_fld] + data_flds,
+                                   extra, self.tmpDir)
+                if not cache.enabled:
+                    feedback.pushInfo('Cache not used: the layer is not a file '
+                                      '(memory, database or web service layer)')
+                    cache = None
+                else:
+                    store, dstats = cache.load()
+                if store is not None:
+                    stats    = [StreamStats.from_dict(d) for d in dstats['data']]
+                    sketches = [QuantileSketch.from_dict(d) for d in dstats['sketch']]
+                    feedback.pushInfo('Lines read from cache: %s' % cache.bin)
+        if store is None:
+            # All channels read in one pass
+            ix = [line_ix, fidu_ix] + data_ix
             try:
-                for point in points:
-                    xyzf.append([point.x(), point.y(), fiduu, rdata])
-                    nL += 1
-            except:
-                pass
-        # last line
-        if xyzf != []:
-            lines.append([lineN, nL])
-            the_csv = os.path.join(self.tmpDir, '%s.csv' % str(lineN))
-            with codecs.open(the_csv, 'w', 'utf-8') as fo:
-                fo.write('X,Y,FID,Data\n')
-                for ar in xyzf:
-                    fo.write(','.join(map(str, ar)))
-                    fo.write('\n')
-            le = sqrt((xyzf[0][0] - xyzf[-1][0])**2 + 
-                      (xyzf[0][1] - xyzf[-1][1])**2)
-            if le > TL:
-                TL = le
+                store, stats, sketches = self._read_lines(the_layer, ix, dumval, spill,
+                                                          feedback, bGaps, bCompact)
+            except ValueError as e:
+                raise QgsProcessingException('%s: %s' % (self._the_strings["ERR"], e))
+            if (len(store) and not feedback.isCanceled() and cache is not None and
+                not cache.save(store, {'data':[st.as_dict() for st in stats],
+                                       'sketch':[sk.as_dict() for sk in sketches]})):
+                feedback.pushInfo('Cannot write cache: %s' % cache.bin)
+        timer.stop()
+        npoints = int(store.offsets[-1]) if len(store) else 0
+        timer.count('read', npoints)
+        if len(store) == 0 or feedback.isCanceled():
+            if not store.close():
+                feedback.pushInfo('Cannot delete scratch file: %s' % store.spill)
+            return results
+        # Azimuth, distance between end points and length of all lines, computed once
+        # for all channels from all their points
+        timer.start('geometry')
+        timer.count('geometry', npoints)
+        geom = []
+        for l0, l1 in store.groups(max_pts):
+            X, Y, F, _, offs = store.block(l0, l1)
+            geom.append(line_geometry(X, Y, offs) + (F[offs[:-1]],))
+        aziN, distep, clength, fid0 = [np.concatenate(g) for g in zip(*geom)]
+        # Line vs tie-line and profile direction of all lines (not reversed),
+        # from the histogram of the axes of all lines, weighted by line length.
+        # Side of the profiles set by the first line flown (lowest fiducial)
+        invs, types = classify_lines(aziN, 1, clength, rank=fid0)
+        # Lines of each channel, without its dummy values (unless split at gaps)
+        chans = []
+        for k in range(nch):
+            view = store.channel(k, not bGaps)
+            if len(view) == 0:
+                feedback.pushInfo('No valid data in channel: %s' % data_flds[k])
+                continue
+            il = np.arange(len(store)) if view.lines is None else view.lines
+            chans.append([k, view, list(view.groups(max_pts)), aziN[il], distep[il],
+                          clength[il], invs[il], [types[i] for i in il]])
+        timer.stop()
+        #
+        # Along-line filter of the data, before scaling: statistics of filtered data
+        fdata = {}
+        if fkind != 'none':
+            timer.start('filter')
+            timer.count('filter', npoints)
+            for ch in chans:
+                k, view, blocks = ch[:3]
+                fstats, fsketch, kept = StreamStats(), QuantileSketch(), []
+                for l0, l1 in blocks:
+                    if feedback.isCanceled():
+                        break
+                    _, _, _, D, offs = view.block(l0, l1)
+                    FD = filter_lines(D, offs, fkind, fwidth)
+                    fstats.update(FD)
+                    fsketch.update(FD)
+                    if not bOOC:
+                        # Keep filtered data in memory, filter again block by block else
+                        kept.append(FD)
+                stats[k], sketches[k] = fstats, fsketch
+                fdata[k] = None if bOOC else kept
+            timer.stop()
+        # Longest line over all channels: same scale for all channels
+        timer.start('scaling')
+        TL = max(ch[4].max() for ch in chans)
         #
-        stat.finalize()
-        self.dmean = stat.mean()
-        self.mult = TL / (stat.max() - stat.min())
+        # Statistics and scaling of each channel
+        for ch in chans:
+            k = ch[0]
+            lo, hi = self._data_range(stats[k], sketches[k], pct)
+            ch += [stats[k].mean, TL / (hi - lo)]
         #
         if bCHscal:
             # Scaling field: retrieve its stats
             scch_fld = self.parameterAsString(parameters, self.SCALCH, context)
-            scch     = scally.fields().at(scally.fields().lookupField(scch_fld))
             scch_ix  = scally.fields().lookupField(scch_fld)
             scch_f   = scally.getFeatures(QgsFeatureRequest().setSubsetOfAttributes(
-                           [scch_ix]), 
+                           [scch_ix]).setFlags(QgsFeatureRequest.NoGeometry), 
                            QgsProcessingFeatureSource.FlagSkipGeometryValidityChecks)
-            stat  = QgsStatisticalSummary()
-            for current, ft in enumerate(scch_f):
-                stat.addVariant(ft[scch.name()])
-            stat.finalize()
-            self.dmean = stat.mean()
-            self.mult = TL / (stat.max() - stat.min())
-        #
-        if invP:
-            iv = -1
-        else:
-            iv = 1
-
-# Profile
-        total = 40.0 / (len(lines) + 1)
-        # For each line:
-        for current, z in enumerate(lines):
-            line = z[0]
-            if feedback.isCanceled():
-                break
-            if not ft.hasGeometry():
-                continue
-            feedback.setProgress(int(current * total) + 60.)
-
-            # Read line back from csv
-            the_csv = os.path.join(self.tmpDir, '%s.csv' % str(line))
-            if not os.path.exists(the_csv):
-                raise ValueError('It seems parameters are swaped: LINE <-> DATA!')
-
-            ar = pd.read_csv(the_csv)
-            ar = ar.sort_values('FID')
-
-            # Create the profile
-            px, py = self._do_profile(ar, iv, scale, offset)
-
-            #Construct vector layer
-            f = QgsFeature()
-            typeL  = str(self.type)
-            azimut = float(self.azimut)
-            Len    = float(self.length)
-            CLen   = float(self.clength)
-            f.setAttributes([str(line), typeL, int(len(px)), azimut, Len, CLen])
-            line_pts = [QgsPoint(x,y, m=m) for x,y, m in zip(px, py, ar.Data)]
-            if join_to_line:
-                # Join profile to its line
-                e = len(ar) - 1
-                ar0 = [QgsPoint(ar.X[0],ar.Y[0], m=0.)]
-                ar1 = [QgsPoint(ar.X[e],ar.Y[e], m=0.)]
-                line_pts = ar0 + line_pts + ar1
-            #
-            f.setGeometry(QgsGeometry(QgsLineString(line_pts)))
-            sink.addFeature(f, QgsFeatureSink.FastInsert)
-            # Delete temp csv file
+            sstats  = StreamStats(dumval)
+            ssketch = QuantileSketch(dummy=dumval)
+            for _, _, (v,) in PointExtractor(scch_f, [scch_ix], [np.float64],
+                                             geometry=False):
+                sstats.update(v)
+                ssketch.update(v)
+            lo, hi = self._data_range(sstats, ssketch, pct)
+            for ch in chans:
+                ch[8], ch[9] = sstats.mean, TL / (hi - lo)
+        timer.stop()
+
+# Write
+        redo, index = None, None
+        if outfile:
+            timer.start('output')
+            old = None
+            if bIncr:
+                # Incremental: hash every line with its type and direction; everything
+                # shared by all lines (fields, scaling...) goes in the global key
+                gkey = global_key([ofields, int(output_wkb), variants, join_to_line, tol,
+                                   bGaps, fid_gap, dist_gap, fkind, fwidth,
+                                   [[data_flds[ch[0]], ch[8], ch[9]] for ch in chans]])
+                index  = LineIndex(outfile)
+                old    = index.load(gkey)
+                hashes = {}
+                redo   = {}
+                for k, view, blocks, _, _, _, invs, types, _, _ in chans:
+                    keys = ['%s\t%s' % (data_flds[k], n) for n in view.names]
+                    hs   = []
+                    for l0, l1 in blocks:
+                        X, Y, F, D, offs = view.block(l0, l1)
+                        hs += line_hashes(X, Y, F, D, offs,
+                                          list(zip(invs[l0:l1].tolist(), types[l0:l1])))
+                    hashes.update(zip(keys, hs))
+                    redo[k] = np.array([old is None or old.get(ky) != h
+                                        for ky, h in zip(keys, hs)], dtype=bool)
+            else:
+                LineIndex(outfile).remove()
             try:
-                os.remove(the_csv)
-            except:
-                pass
+                sink = OgrWriter(outfile, lname, int(output_wkb), ofields,
+                                 the_layer.sourceCrs().toWkt(), self._ogr_batch,
+                                 update=old is not None)
+            except (IOError, ValueError) as e:
+                raise QgsProcessingException('%s: %s' % (self._the_strings["ERR"], e))
+            if old is not None:
+                # Remove lines that changed or are gone, channel by channel
+                stale = {}
+                for ky in old:
+                    if hashes.get(ky) != old[ky]:
+                        ch_name, line = ky.split('\t', 1)
+                        stale.setdefault(ch_name, []).append(line)
+                for ch_name, lines in stale.items():
+                    sink.delete('Line', lines,
+                                '"Channel" = \'%s\'' % ch_name.replace("'", "''")
+                                if bMulti else '')
+                feedback.pushInfo('Incremental update: %d line(s) re-written' %
+                                  sum(int(r.sum()) for r in redo.values()))
+            context.addLayerToLoadOnCompletion(outfile,
+                QgsProcessingContext.LayerDetails(lname, context.project(), self.OUTPUT))
+            timer.stop()
 
-        return {self.OUTPUT:dest_id}
+# Profile
+        # Progress and cancellation checked every few thousand lines or 0.2 s
+        progress = ProgressThrottle(feedback, sum(len(ch[1]) for ch in chans) *
+                                    len(variants), 60., 40., every=5000, stride=100)
+        batch   = []
+        fbatch  = []
+        gaps    = (fid_gap, dist_gap) if bGaps else None
+        fill    = (fill_signs, fill_thr) if fsink is not None else None
+        # One pool of workers for the whole run, started by the first large block
+        pool = ProfilePool(nworkers)
+        largest = max([int(ch[1].offsets[l1] - ch[1].offsets[l0])
+                       for ch in chans for l0, l1 in ch[2]] or [0])
+        if nworkers > 1 and largest < pool.min_points:
+            feedback.pushInfo('Blocks of lines smaller than %d points: '
+                              'worker processes not used' % pool.min_points)
+        timer.start('profile')
+        for k, view, blocks, aziN, distep, clength, invs, types, dmean, mult in chans:
+            for nb, (l0, l1) in enumerate(blocks):
+                if feedback.isCanceled():
+                    break
+                if redo is not None and fsink is None and not redo[k][l0:l1].any():
+                    # Incremental: nothing changed in the block
+                    progress.step((l1 - l0) * len(variants))
+                    continue
+                X, Y, F, D, offs = view.block(l0, l1)
+                timer.count('profile', len(X) * len(variants))
+                filt = None
+                if fkind != 'none':
+                    # Filtered data kept in memory, filtered again block by block else
+                    if fdata[k]:
+                        D = fdata[k][nb]
+                    else:
+                        filt = (fkind, fwidth)
+                # Data are read once: filter, gaps, profiles of every variant, fill and
+                # WKB of all lines of the block, on the workers if any
+                res = parallel_block(X, Y, F, D, offs, aziN[l0:l1], invs[l0:l1],
+                                     (variants, dmean, mult),
+                                     {'filt':filt, 'gaps':gaps, 'tol':tol,
+                                      'join':join_to_line, 'fill':fill},
+                                     pool, feedback)
+                if res is None:
+                    # Canceled while the workers were running: no profiles
+                    break
+                for nv, ((sc, of, iv), (wkbs, npts, fills)) in enumerate(zip(variants,
+                                                                              res)):
+                    for sg, fwkbs, has in fills:
+                        for il, wkb in zip(range(l0, l1), fwkbs):
+                            if not has[il-l0]:
+                                continue
+                            attrs = [str(view.names[il]), '+' if sg > 0 else '-']
+                            if bMulti:
+                                attrs.append(data_flds[k])
+                            if bSweep:
+                                attrs.append(nv + 1)
+                            fbatch.append((wkb, attrs))
+                        if len(fbatch) >= self._batch:
+                            with timer.phase('write'):
+                                self._write(fsink, fbatch)
+                            fbatch = []
+                    # For each line:
+                    for il, wkb in zip(range(l0, l1), wkbs):
+                        if progress.step():
+                            break
+                        if npts[il-l0] == 0:
+                            # Only gaps: nothing to draw
+                            continue
+                        if redo is not None and not redo[k][il]:
+                            # Incremental: line unchanged
+                            continue
+
+                        #Construct vector layer
+                        attrs = [str(view.names[il]), types[il],
+                                 int(npts[il-l0]), float(aziN[il]),
+                                 float(distep[il]), float(clength[il])]
+                        if bMulti:
+                            attrs.append(data_flds[k])
+                        if bSweep:
+                            attrs += [nv + 1, float(sc), float(of), int(iv < 0)]
+                        batch.append((wkb, attrs))
+                        if len(batch) >= self._batch:
+                            with timer.phase('write'):
+                                self._write(sink, batch)
+                            batch = []
+        timer.stop()
+        pool.close()
+        timer.start('write')
+        if batch:
+            self._write(sink, batch)
+        if fbatch:
+            self._write(fsink, fbatch)
+
+        # Views on the scratch file released first: a mapped file cannot be deleted
+        X = Y = F = D = offs = None
+        if not store.close():
+            feedback.pushInfo('Cannot delete scratch file: %s' % store.spill)
+        if outfile:
+            # Commit and build the spatial index
+            sink.close()
+        timer.stop()
+        if outfile:
+            if index is not None:
+                if feedback.isCanceled():
+                    index.remove()
+                elif not index.save(gkey, hashes):
+                    feedback.pushInfo('Cannot write line index: %s' % index.fname)
+        #
+        # Time, throughput and process peak memory at the end of every phase
+        for line in timer.report():
+            feedback.pushInfo(line)
+        if bTiming:
+            fname = self._timing_file(outfile or dest_id)
+            extra = {'algorithm':self.name(), 'channels':data_flds,
+                     'variants':len(variants), 'lines':sum(len(ch[1]) for ch in chans),
+                     'points':npoints, 'out_of_core':bOOC, 'compact':bCompact,
+                     'workers':nworkers}
+            if timer.save(fname, extra):
+                feedback.pushInfo('Timing report: %s' % fname)
+            else:
+                feedback.pushInfo('Cannot write timing report: %s' % fname)
+        return results
     #-------------------------------------------------------------------------------------
 
     def get_error(self):
@@ -39,6 +39,7 @@ from qgis.core import (QgsProcessingAlgorithm, QgsProcessing,
                        QgsFeatureSink)
 
 from .setparams import set_param
+from .QgsBcUtils import ProgressThrottle
 from .HelpbcA import help_bcSwapYZ
 
 is_dependencies_satisfied = True
@@ -213,10 +214,10 @@ class bcSwapYZAlgorithm(QgsProcessingAlgorithm):
         if sink is None:
             raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT))
 
-        total = 100.0 / the_layer.featureCount() if the_layer.featureCount() else 0
+        progress = ProgressThrottle(feedback, the_layer.featureCount())
         features = the_layer.getFeatures()
-        for current, f in enumerate(features):
-            if feedback.isCanceled():
+        for f in features:
+            if progress.step():
                 break
 
             # Copy attributes
@@ -237,7 +238,6 @@ class bcSwapYZAlgorithm(QgsProcessingAlgorithm):
 
             # Store output feature
             sink.addFeature(fz, QgsFeatureSink.FastInsert)
-            feedback.setProgress(int(current * total))
 
         return {self.OUTPUT:dest_id}
     #-------------------------------------------------------------------------------------
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        begin                : 2026-10-18
+        copyright            : (C) 2019-2026 by GeoProc.com
+        email                : info@geoproc.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 3 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+  BENCH_PARALLEL
+  Speed-up of the worker processes of bcStackP3 (NWORKERS), without QGIS: the
+  output features of one block of lines of a synthetic survey (bench/survey.py)
+  are computed in the current process (stackp.profile_block) then on pools of
+  1, 2, 4... workers (stackp.parallel_block, pool started before timing, as in a
+  run). Outputs are checked equal to the serial ones.
+
+  Usage (from the plugin directory, any python with numpy):
+      python bench/bench_parallel.py --points 3e6 --workers 2,4,8
+      python bench/bench_parallel.py --points 1e7 --variants 3 --fill --tol 1
+
+  The pool only pays when every worker has a core of its own: on a single core
+  the ratio shows the cost of the shared memory copy and of the transfer of the
+  WKB back to the main process.
+
+WARNING: code formatting does not follow pycodestyle recommendations
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+HERE    = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+import survey
+from stackp import line_geometry, classify_lines, profile_block, ProfilePool
+from stackp import parallel_block
+
+
+def block(npoints, seed=0):
+    ''' Arrays (X, Y, FID, Data, offsets) of a synthetic survey, with the azimuth
+        and direction of its lines.
+    '''
+    #
+    X, Y, F, D, n = [], [], [], [], []
+    for _, x, y, f, d in survey.lines(npoints, seed):
+        X.append(x), Y.append(y), F.append(f), D.append(d), n.append(len(x))
+    X, Y, F, D = [np.concatenate(a) for a in (X, Y, F, D)]
+    offs = np.r_[0, np.cumsum(n)]
+    aziN, _, clength = line_geometry(X, Y, offs)
+    invs, _ = classify_lines(aziN, 1, clength)
+    return X, Y, F, D, offs, aziN, invs
+#=========================================================================================
+
+class _Feedback():
+    def isCanceled(self):
+        return False
+
+    def pushInfo(self, text):
+        print(text)
+#=========================================================================================
+
+def _best(fn, repeat):
+    ''' Best wall time of repeat calls of fn and its last result. '''
+    #
+    best = None
+    for _ in range(repeat):
+        t0  = time.perf_counter()
+        res = fn()
+        dt  = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, res
+#=========================================================================================
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Speed-up of the bcStackP3 workers')
+    ap.add_argument('--points', type=float, default=3e6, help='points of the block')
+    ap.add_argument('--workers', default='2,4', help='pool sizes to time')
+    ap.add_argument('--variants', type=int, default=1, help='display variants')
+    ap.add_argument('--filter', default='none', help='none, mean, median or lowpass')
+    ap.add_argument('--tol', type=float, default=0., help='decimation tolerance')
+    ap.add_argument('--fill', action='store_true', help='wiggle fill both signs')
+    ap.add_argument('--repeat', type=int, default=3, help='runs per timing (best)')
+    args = ap.parse_args(argv)
+
+    X, Y, F, D, offs, aziN, invs = block(int(args.points))
+    dd = np.nanmax(D) - np.nanmin(D)
+    pargs  = ([(1. + v, 0., 1) for v in range(args.variants)], float(np.mean(D)),
+              100. / dd)
+    kwargs = {'filt':None if args.filter == 'none' else (args.filter, 11),
+              'gaps':None, 'tol':args.tol, 'join':False,
+              'fill':([1, -1], 0.) if args.fill else None}
+    print('%d points, %d lines, %d cpu' % (len(X), len(offs) - 1, os.cpu_count()))
+    t1, ref = _best(lambda: profile_block(X, Y, F, D, offs, aziN, invs, *pargs,
+                                          **kwargs), args.repeat)
+    print('%-10s %10s %8s' % ('Workers', 'Time (s)', 'Speedup'))
+    print('%-10s %10.3f %8.2f' % ('serial', t1, 1.))
+    for nw in [int(w) for w in args.workers.split(',') if w]:
+        pool = ProfilePool(nw, min_points=0)
+        try:
+            # Start the workers before timing: once per run in bcStackP3
+            e = offs[2]
+            parallel_block(X[:e], Y[:e], F[:e], D[:e], offs[:3], aziN[:2], invs[:2],
+                           pargs, kwargs, pool, _Feedback())
+            tn, res = _best(lambda: parallel_block(X, Y, F, D, offs, aziN, invs, pargs,
+                                                   kwargs, pool, _Feedback()),
+                            args.repeat)
+        finally:
+            pool.close()
+        same = all(a[0] == b[0] for a, b in zip(ref, res))
+        print('%-10d %10.3f %8.2f%s' % (nw, tn, t1 / tn, '' if same else '  DIFFERENT'))
+    return 0
+#=========================================================================================
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        begin                : 2026-10-18
+        copyright            : (C) 2019-2026 by GeoProc.com
+        email                : info@geoproc.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 3 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+  BENCH_STACKP
+  Headless benchmark of bcStackP3 on synthetic surveys of 10^4 to 10^8 points.
+
+  Every run times the algorithm end to end and per phase (timing report of
+  bcStackP3, see its 'Write timing report' option) and all runs are saved in one
+  JSON file, to be kept as a baseline and compared with later runs.
+
+  Usage (from the plugin directory, with the python of QGIS):
+      python bench/bench_stackp.py --sizes 1e4,1e5,1e6 --variants lines,dummy
+      python bench/bench_stackp.py --out bench/baselines/3.40.json
+      python bench/bench_stackp.py --baseline bench/baselines/3.40.json
+      python bench/bench_stackp.py --param OUTOFCORE=True --param NWORKERS=4
+      python bench/bench_stackp.py --qgis-process     (plugin enabled in QGIS)
+
+  Surveys are written once in the work folder (--workdir) and re-used: 10^8
+  points take a while to generate. The default engine is a standalone
+  QgsApplication with the plugin loaded from this folder; --qgis-process runs the
+  installed plugin through the qgis_process command line tool instead.
+  Peak memory is that of the process: it only grows from run to run in a
+  standalone QgsApplication, use --qgis-process to get it per run.
+  Comparing with a baseline prints the ratio of the times (new / baseline) and
+  exits with status 1 if a run is slower than the baseline by more than the
+  tolerance.
+
+WARNING: code formatting does not follow pycodestyle recommendations
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import importlib
+
+HERE    = os.path.dirname(os.path.abspath(__file__))
+PLUGIN  = os.path.dirname(HERE)
+sys.path.insert(0, PLUGIN)
+sys.path.insert(0, HERE)
+import survey
+
+ALGO    = 'GeoProc:bcStackP3'
+SIZES   = '1e4,1e5,1e6'
+
+
+def _version():
+    ''' Plugin version (metadata.txt) and git commit, if any. '''
+    #
+    version = ''
+    with open(os.path.join(PLUGIN, 'metadata.txt'), 'r') as fi:
+        for line in fi:
+            if line.startswith('version='):
+                version = line.split('=', 1)[1].strip()
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PLUGIN,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return version, commit
+#=========================================================================================
+
+def _params(layer, output, extra):
+    ''' Parameters of bcStackP3 for a survey layer. '''
+    #
+    params = {'THE_LAYER':layer, 'FID_FLD':'FID', 'DATA_FLD':['Data'], 'LINE_FLD':'Line',
+              'DUMVAL':survey.DUMMY, 'TIMING':True, 'OUTPUT':output}
+    params.update(extra)
+    return params
+#=========================================================================================
+
+class QgsEngine():
+    ''' Run bcStackP3 in a standalone QgsApplication, plugin loaded from PLUGIN. '''
+    #
+    def __init__(self):
+        from qgis.core import QgsApplication
+        QgsApplication.setPrefixPath(os.environ.get('QGIS_PREFIX_PATH', '/usr'), True)
+        self.app = QgsApplication([], False)
+        self.app.initQgis()
+        sys.path.append(os.path.join(QgsApplication.pkgDataPath(), 'python', 'plugins'))
+        import processing
+        from processing.core.Processing import Processing
+        Processing.initialize()
+        # Import the plugin by the name of its folder, from its parent folder: the
+        # worker processes (NWORKERS) are spawned and import it by that same name
+        parent = os.path.dirname(PLUGIN)
+        sys.path.insert(0, parent)
+        os.environ['PYTHONPATH'] = os.pathsep.join(
+            [parent] + [p for p in [os.environ.get('PYTHONPATH')] if p])
+        name = os.path.basename(PLUGIN)
+        provider = importlib.import_module(name + '.GeoProc_provider')
+        self.provider = provider.geoprocProvider()
+        QgsApplication.processingRegistry().addProvider(self.provider)
+        self.processing = processing
+        from qgis.core import Qgis
+        self.qgis = Qgis.QGIS_VERSION
+    #-------------------------------------------------------------------------------------
+
+    def run(self, params):
+        from qgis.core import QgsProcessingFeedback
+        self.processing.run(ALGO, params, feedback=QgsProcessingFeedback())
+    #-------------------------------------------------------------------------------------
+
+    def close(self):
+        self.app.exitQgis()
+    #-------------------------------------------------------------------------------------
+
+class QgisProcessEngine():
+    ''' Run bcStackP3 through the qgis_process command line tool. '''
+    #
+    def __init__(self, exe='qgis_process'):
+        self.exe  = exe
+        out = subprocess.run([exe, '--version'], capture_output=True, text=True).stdout
+        self.qgis = (out.strip().splitlines() or [''])[0]
+    #-------------------------------------------------------------------------------------
+
+    def run(self, params):
+        args = [self.exe, 'run', ALGO, '--']
+        for k, v in params.items():
+            for item in (v if isinstance(v, list) else [v]):
+                args.append('%s=%s' % (k, item))
+        res = subprocess.run(args, capture_output=True, text=True)
+        if res.returncode:
+            raise RuntimeError(res.stderr or res.stdout)
+    #-------------------------------------------------------------------------------------
+
+    def close(self):
+        pass
+    #-------------------------------------------------------------------------------------
+
+def run_one(engine, workdir, variant, npoints, extra, seed):
+    ''' Generate (once) and stack a survey. Return the record of the run. '''
+    #
+    tag   = '%s_%d' % (variant, npoints)
+    layer = os.path.join(workdir, 'survey_%s_s%d.gpkg' % (tag, seed))
+    t0 = time.perf_counter()
+    npt = survey.write_survey(layer, variant, npoints, seed)
+    if npt is not None:
+        print('  survey %s: %d points in %.1f s' % (tag, npt, time.perf_counter() - t0))
+    output = os.path.join(workdir, 'stackp_%s.gpkg' % tag)
+    report = os.path.splitext(extra.get('OUTFILE') or output)[0] + '.timing.json'
+    for fname in (output, report):
+        if os.path.exists(fname):
+            os.remove(fname)
+    t0 = time.perf_counter()
+    engine.run(_params(layer, output, extra))
+    wall = time.perf_counter() - t0
+    rec = {'survey':tag, 'variant':variant, 'size':npoints, 'wall_seconds':round(wall, 4)}
+    if os.path.exists(report):
+        with open(report, 'r') as fi:
+            timing = json.load(fi)
+        rec.update({k:timing.get(k) for k in ('points', 'lines', 'phases', 'peak_rss_mb',
+                                              'total_seconds')})
+    return rec
+#=========================================================================================
+
+def compare(runs, baseline, tol):
+    ''' Print the ratio new / baseline of the times of matching runs. Return the list
+        of the surveys slower than the baseline by more than tol.
+    '''
+    #
+    base = {r['survey']:r for r in baseline['runs']}
+    slow = []
+    print('\n%-24s %10s %10s %8s' % ('Survey', 'Base (s)', 'New (s)', 'Ratio'))
+    for r in runs:
+        b = base.get(r['survey'])
+        if b is None or not b['wall_seconds']:
+            continue
+        ratio = r['wall_seconds'] / b['wall_seconds']
+        print('%-24s %10.2f %10.2f %8.2f' % (r['survey'], b['wall_seconds'],
+                                             r['wall_seconds'], ratio))
+        bph = {p['phase']:p['seconds'] for p in b.get('phases') or []}
+        for p in r.get('phases') or []:
+            if bph.get(p['phase']):
+                print('  %-22s %10.2f %10.2f %8.2f' % (p['phase'], bph[p['phase']],
+                      p['seconds'], p['seconds'] / bph[p['phase']]))
+        if ratio > 1. + tol:
+            slow.append(r['survey'])
+    return slow
+#=========================================================================================
+
+def _value(text):
+    ''' Parameter value from the command line: bool, number or string. '''
+    #
+    if text in ('True', 'False'):
+        return text == 'True'
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+#=========================================================================================
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Benchmark of bcStackP3 (headless)')
+    ap.add_argument('--sizes', default=SIZES,
+                    help='survey sizes, in points (default: %s, up to 1e8)' % SIZES)
+    ap.add_argument('--variants', default=','.join(survey.VARIANTS),
+                    help='survey variants (%s)' % ', '.join(survey.VARIANTS))
+    ap.add_argument('--workdir', default=os.path.join(HERE, 'work'),
+                    help='folder of the surveys and outputs')
+    ap.add_argument('--param', action='append', default=[], metavar='KEY=VALUE',
+                    help='extra bcStackP3 parameter (repeat as needed)')
+    ap.add_argument('--seed', type=int, default=0, help='random seed of the surveys')
+    ap.add_argument('--out', help='JSON results file (default: bench/results/<time>.json)')
+    ap.add_argument('--baseline', help='JSON results file to compare with')
+    ap.add_argument('--tolerance', type=float, default=0.15,
+                    help='relative slow down tolerated against the baseline')
+    ap.add_argument('--qgis-process', nargs='?', const='qgis_process', default=None,
+                    metavar='EXE', help='run through qgis_process instead of PyQGIS')
+    args = ap.parse_args(argv)
+
+    sizes    = [int(float(s)) for s in args.sizes.split(',') if s]
+    variants = [v for v in args.variants.split(',') if v]
+    extra    = dict(p.split('=', 1) for p in args.param)
+    extra    = {k:_value(v) for k, v in extra.items()}
+    os.makedirs(args.workdir, exist_ok=True)
+
+    engine = QgisProcessEngine(args.qgis_process) if args.qgis_process else QgsEngine()
+    version, commit = _version()
+    runs = []
+    try:
+        for npoints in sizes:
+            for variant in variants:
+                rec = run_one(engine, args.workdir, variant, npoints, extra, args.seed)
+                print('%-24s %10.2f s' % (rec['survey'], rec['wall_seconds']))
+                runs.append(rec)
+    finally:
+        engine.close()
+
+    results = {'version':version, 'commit':commit, 'qgis':engine.qgis,
+               'python':platform.python_version(), 'platform':platform.platform(),
+               'machine':platform.node(), 'date':time.strftime('%Y-%m-%dT%H:%M:%S'),
+               'seed':args.seed, 'params':extra, 'runs':runs}
+    out = args.out or os.path.join(HERE, 'results', time.strftime('%Y%m%d_%H%M%S.json'))
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as fo:
+        json.dump(results, fo, indent=1)
+    print('Results: %s' % out)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as fi:
+            slow = compare(runs, json.load(fi), args.tolerance)
+        if slow:
+            print('Slower than baseline: %s' % ', '.join(slow))
+            return 1
+    return 0
+#=========================================================================================
+
+if __name__ == '__main__':
+    sys.exit(main())
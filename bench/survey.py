@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        begin                : 2026-10-18
+        copyright            : (C) 2019-2026 by GeoProc.com
+        email                : info@geoproc.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 3 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+  SURVEY
+  Reproducible synthetic point surveys for the bcStackP benchmarks.
+
+  Same layout as the output of bcGenRNDSurveyData3 (fields X, Y, FID, Line, Data;
+  lines 100, 110... then tie-lines 10100, 10110...; data: smooth signal + noise
+  + spikes, with the running mean and the default spikes of bcGenRNDSurveyData3:
+  stackp.smooth, stackp.spikes), generated with numpy line by line and written to
+  a GeoPackage through OGR: sizes up to 10^8 points are out of reach of a feature
+  sink.
+
+  Variants (layout of the features in the file):
+      lines        one point per feature, line after line
+      interleaved  points of groups of lines in round-robin order (unsorted input)
+      multipoint   MULTIPOINT features of a few consecutive points of a line
+      dummy        as lines, with ~30% of the data set to the dummy value or NULL
+
+WARNING: code formatting does not follow pycodestyle recommendations
+"""
+
+import os
+import numpy as np
+from stackp import smooth, spikes
+
+VARIANTS = ['lines', 'interleaved', 'multipoint', 'dummy']
+DUMMY    = -99999.
+FIELDS   = [('X', 'Real', 24, 6), ('Y', 'Real', 24, 6), ('FID', 'Integer', 12, 0),
+            ('Line', 'String', 12, 0), ('Data', 'Real', 24, 6)]
+_GROUP   = 8        # lines per round-robin group (interleaved)
+_MULTI   = 4        # points per multipoint feature (multipoint)
+
+
+def layout(npoints):
+    ''' Number of lines, points per line, tie-lines and points per tie-line of a
+        survey of about npoints points (~10% on tie-lines).
+    '''
+    #
+    n   = int(np.clip(np.sqrt(npoints * 10.), 100, 5000))
+    nL  = max(2, int(round(0.9 * npoints / n)))
+    nT  = max(2, nL // 10)
+    npT = max(10, int(round(0.1 * npoints / nT)))
+    return nL, n, nT, npT
+#=========================================================================================
+
+def lines(npoints, seed=0, dmin=2.8e4, dmax=3e4, size=1e4):
+    ''' Yield (name, x, y, fid, data) of every line then tie-line of a survey of about
+        npoints points, over a square of size map units (UTM-like coordinates).
+    '''
+    #
+    rng = np.random.default_rng(seed)
+    nL, n, nT, npT = layout(npoints)
+    x0, y0 = 500000., 7000000.
+    dx, dy = size / n, size / nL
+    dd  = dmax - dmin
+    w   = np.linspace(-2 * np.pi, 4 * np.pi, n)
+    ramp = np.minimum(np.arange(n), n - 1 - np.arange(n)) / 2.
+    base = 0.01 * (np.sin(w) + np.cos(w)) * dd + dmin + ramp
+    fid  = 0
+    for j in range(nL):
+        x = x0 + np.arange(n) * dx + 0.03 * dx * (rng.random(n) - 0.5)
+        y = y0 + j * dy + 0.1 * dy * (rng.random() - 0.5) + \
+            0.03 * dy * (rng.random(n) - 0.5)
+        d = smooth(np.roll(base, j % 50) + 0.03 * dd * (rng.random(n) - 0.5))
+        # Spikes of +/- 2, 2.8, 3.75 or 6 base levels on 0.768% of the points
+        d += (0.05, 0.1, 0.5)[j % 3] * spikes(rng, n) * dd
+        f = fid + np.arange(1, n + 1)
+        fid += n
+        if j % 2:
+            # Every other line flown the other way
+            x, y, d = x[::-1], y[::-1], d[::-1]
+        yield str(100 + 10 * j), x, y, f, d
+    wT = np.linspace(-6 * np.pi, 6 * np.pi, npT)
+    for j in range(nT):
+        y = y0 + np.arange(npT) * size / npT + 0.03 * dx * (rng.random(npT) - 0.5)
+        x = x0 + (j + 0.5) * size / nT + 0.03 * dy * (rng.random(npT) - 0.5)
+        d = 0.01 * (np.sin(wT) + np.cos(wT)) * dd / 3. + dmin + \
+            0.5 * dd * (rng.random(npT) - 0.5)
+        d = smooth(smooth(smooth(d)))
+        f = fid + np.arange(1, npT + 1)
+        fid += npT
+        if j % 2:
+            x, y, d = x[::-1], y[::-1], d[::-1]
+        yield str(10100 + 10 * j), x, y, f, d
+#=========================================================================================
+
+def _point_wkb(x, y):
+    ''' WKB of points (little endian), one blob per point. '''
+    #
+    rec = np.empty(len(x), dtype=[('bo', 'u1'), ('type', '<u4'), ('x', '<f8'),
+                                  ('y', '<f8')])
+    rec['bo'], rec['type'], rec['x'], rec['y'] = 1, 1, x, y
+    raw = rec.tobytes()
+    return [raw[i:i+21] for i in range(0, len(raw), 21)]
+#=========================================================================================
+
+def _multipoint_wkb(x, y, k):
+    ''' WKB of multipoints of k consecutive points (last one shorter). '''
+    #
+    pts = _point_wkb(x, y)
+    out = []
+    for i in range(0, len(pts), k):
+        grp = pts[i:i+k]
+        out.append(b'\x01' + np.array([4, len(grp)], dtype='<u4').tobytes() +
+                   b''.join(grp))
+    return out
+#=========================================================================================
+
+def features(variant, npoints, seed=0):
+    ''' Yield lists of (WKB, [X, Y, FID, Line, Data]) features of a survey variant,
+        a few lines at a time.
+    '''
+    #
+    if variant not in VARIANTS:
+        raise ValueError('Unknown survey variant: %s' % variant)
+    rng = np.random.default_rng(seed + 1)
+    gen = lines(npoints, seed)
+    while True:
+        grp = [ln for _, ln in zip(range(_GROUP), gen)]
+        if not grp:
+            return
+        feats = []
+        for name, x, y, f, d in grp:
+            d = d.astype(object)
+            if variant == 'dummy':
+                # Runs of dummy values and a few NULL
+                bad = np.convolve(rng.random(len(d)) < 0.06, np.ones(5), 'same') > 0
+                d[bad] = DUMMY
+                d[rng.random(len(d)) < 0.01] = None
+            attrs = [[float(a), float(b), int(c), name, e if e is None else float(e)]
+                     for a, b, c, e in zip(x, y, f, d)]
+            if variant == 'multipoint':
+                wkbs  = _multipoint_wkb(x, y, _MULTI)
+                attrs = attrs[::_MULTI]
+            else:
+                wkbs = _point_wkb(x, y)
+            feats.append(list(zip(wkbs, attrs)))
+        if variant == 'interleaved':
+            # Round-robin over the lines of the group
+            n   = max(len(fl) for fl in feats)
+            out = [fl[i] for i in range(n) for fl in feats if i < len(fl)]
+        else:
+            out = [ft for fl in feats for ft in fl]
+        yield out
+#=========================================================================================
+
+def write_survey(fname, variant, npoints, seed=0, crs_wkt=''):
+    ''' Write a survey variant to the GeoPackage fname (layer 'survey'), unless it
+        already exists. Return: number of points written (None if it existed).
+    '''
+    #
+    if os.path.exists(fname):
+        return None
+    from stackp import OgrWriter
+    tmp = fname + '.tmp.gpkg'
+    gtype = 4 if variant == 'multipoint' else 1
+    wr  = OgrWriter(tmp, 'survey', gtype, FIELDS, crs_wkt)
+    for feats in features(variant, npoints, seed):
+        wr.add_features(feats)
+    wr.close()
+    os.replace(tmp, fname)
+    nL, n, nT, npT = layout(npoints)
+    return nL * n + nT * npT
+#=========================================================================================
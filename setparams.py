@@ -8,7 +8,7 @@ Kind of object handled by routine:
     CRS
     Enum
     EXTENT
-    Field
+    Field              : {'parent':'LAYER'} or {'parent':'LAYER', 'allowMultiple':True}
     File               : {'ext'':'HTML'} or {'fileFilter':'HTML files (*.html), All files (*.*)'}
     FileDestination
     FolderDestination
@@ -18,7 +18,7 @@ Kind of object handled by routine:
     NumberI            : {'defaultValue':0, 'minValue':0, 'maxValue':1}
     Point
     RasterLayer
-    SINK
+    SINK               : {'type':QgsProcessing.TypeVectorLine, 'createByDefault':False}
     String             : {'defaultValue':''}
     VectorLayer
 
@@ -99,7 +99,9 @@ def set_param(param, the_params):
     if 'FILTER'       in arg[3]: dico['fileFilter'] = arg[3]['FILTER']
     if 'ext'          in arg[3]: dico['extension'] = arg[3]['ext']
     if 'parent'       in arg[3]: dico['parentLayerParameterName']=arg[3]['parent']
+    if 'allowMultiple' in arg[3]: dico['allowMultiple'] = arg[3]['allowMultiple']
     if 'type'         in arg[3]: dico['type'] = arg[3]['type']
+    if 'createByDefault' in arg[3]: dico['createByDefault'] = arg[3]['createByDefault']
     if   what == 'NumberD':      dico['type'] = QgsProcessingParameterNumber.Double
     elif what == 'NumberI':      dico['type'] = QgsProcessingParameterNumber.Integer
     #
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        begin                : 2026-10-18
+        copyright            : (C) 2019-2026 by GeoProc.com
+        email                : info@geoproc.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 3 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+  Numpy engine of the stacked profiles algorithm (bcStackP3)
+
+  LineStore
+      columnar store of survey lines: X, Y, FID, Data (one column per data
+      channel) + per-line offsets; channel(): lines of one channel
+
+  StoreCache
+      persistent cache of a LineStore (sidecar files), for fast re-runs
+
+  PointExtractor
+      bulk reader of point features (attributes + WKB) into numpy arrays
+
+  StreamStats
+      mergeable streaming statistics (count, mean, min, max, variance)
+
+  QuantileSketch
+      mergeable, bounded-memory streaming quantile sketch (KLL-like)
+
+  line_geometry, classify_lines, build_profiles, split_gaps
+      batch profile engine working on all lines of a LineStore at once
+
+  profile_block, merge_blocks
+      output features (WKB) of a block of lines: filter, gaps, profiles, fill,
+      decimation, for every display variant
+
+  ProfilePool, parallel_block
+      same as profile_block on a pool of processes, arrays in shared memory
+
+  filter_lines
+      along-line running mean, running median and FFT low-pass, all lines at once
+
+  wiggle_fill
+      wiggle fill polygons between profiles and base lines, all lines at once
+
+  linestrings_m_wkb, multilinestrings_m_wkb, multipolygons_wkb
+      WKB of many lines (polygons) at once, straight from numpy arrays
+
+  OgrWriter
+      bulk writer to GeoPackage/FlatGeobuf through OGR (optional: needs osgeo)
+
+  LineIndex, global_key, line_hashes
+      per-line content hashes of an output, for incremental updates
+
+  simplify_lines
+      Douglas-Peucker decimation of all lines at once
+
+  PhaseTimer
+      wall time, points/s and process peak memory at the end of the phases of a run
+
+  smooth, parse_spikes, spikes
+      signal of synthetic surveys (bcGenRNDSurveyData3, benchmarks)
+
+Nothing in this package depends on QGIS: it can be used (and tested) from any
+python interpreter having numpy.
+
+WARNING: code formatting does not follow pycodestyle recommendations
+"""
+
+from .linestore import LineStore
+from .extract import PointExtractor
+from .cache import StoreCache
+from .stats import StreamStats, QuantileSketch
+from .profile import line_geometry, classify_lines, build_profiles, split_gaps
+from .block import profile_block, merge_blocks
+from .parallel import ProfilePool, parallel_block
+from .filters import FILTERS, filter_lines
+from .fill import wiggle_fill
+from .wkb import linestrings_m_wkb, multilinestrings_m_wkb, multipolygons_wkb
+from .simplify import simplify_lines
+from .ogrout import OgrWriter, has_ogr
+from .incremental import LineIndex, global_key, line_hashes
+from .timing import PhaseTimer
+from .synth import SPIKE_RATE, SPIKE_CLASSES, smooth, parse_spikes, spikes
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        begin                : 2026-10-18
+        copyright            : (C) 2019-2026 by GeoProc.com
+        email                : info@geoproc.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 3 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+  BLOCK
+  Everything computed for a block of lines after reading it: along-line filter,
+  gaps, profiles of every display variant, wiggle fill, decimation and WKB of the
+  output features. Lines are independent: a block can be cut in ranges of lines
+  computed in any order or in parallel (see parallel.parallel_block).
+
+WARNING: code formatting does not follow pycodestyle recommendations
+"""
+
+import numpy as np
+
+from .profile import build_profiles, split_gaps
+from .filters import filter_lines
+from .fill import wiggle_fill
+from .simplify import simplify_lines
+from .wkb import linestrings_m_wkb, multilinestrings_m_wkb, multipolygons_wkb
+
+
+def profile_block(X, Y, FID, Data, offsets, aziN, invs, variants, dmean, mult,
+                  filt=None, gaps=None, tol=0., join=False, fill=None):
+    ''' Output features of a block of lines, for every display variant.
+        X, Y, FID, Data: concatenated arrays of the lines, sorted by fiducial
+        offsets:    line i spans [offsets[i], offsets[i+1])
+        aziN, invs: azimuth and profile direction of each line
+        variants:   list of (scale, offset, inverse) of the profiles
+        dmean, mult: data mean and data to map units multiplier
+        filt:       None or (kind, width) of the along-line filter (filter_lines)
+        gaps:       None or (fid_gap, dist_gap) to split the profiles at gaps
+        tol:        decimation tolerance of the profiles (0: none)
+        join:       if True, profiles are joined to their lines
+        fill:       None or (signs, threshold) of the wiggle fill
+
+        Return: one item per variant: (wkbs, npts, fills)
+                wkbs:  LineStringM (MultiLineStringM with gaps) WKB of every line
+                npts:  number of vertices of every line (0: nothing to draw)
+                fills: list of (sign, wkbs, has) per fill sign: MultiPolygon WKB of
+                       every line and boolean array, True if the line has polygons
+    '''
+    #
+    nl = len(offsets) - 1
+    if filt is not None:
+        Data = filter_lines(Data, offsets, *filt)
+    if gaps is not None:
+        # Parts of the lines between gaps: same for all variants
+        gkeep, goffs, parts = split_gaps(X, Y, FID, Data, offsets, *gaps)
+    ends = None
+    if join:
+        # Join profiles to their lines
+        s0, s1 = offsets[:-1], offsets[1:] - 1
+        ends = (X[s0], Y[s0], X[s1], Y[s1])
+    out = []
+    for sc, of, iv in variants:
+        # Profile coordinates of all lines at once
+        PX, PY = build_profiles(X, Y, Data, offsets, aziN, iv * invs, dmean, mult,
+                                sc, of)
+        fills = []
+        if fill is not None:
+            # Wiggle fill from the full resolution profiles
+            for sg in fill[0]:
+                fx, fy, roffs, rline = wiggle_fill(PX, PY, Data, offsets, aziN,
+                                                   iv * invs, dmean, mult, sc,
+                                                   fill[1], sg)
+                nring  = np.bincount(rline, minlength=nl)
+                groups = np.r_[0, np.cumsum(nring)]
+                fills.append((sg, multipolygons_wkb(fx, fy, roffs, groups), nring > 0))
+        PD, poffs = Data, offsets
+        if gaps is not None:
+            PX, PY, PD, poffs = PX[gkeep], PY[gkeep], Data[gkeep], goffs
+        if tol > 0.:
+            # Decimate profiles: drop vertices closer than tol to the line
+            keep, poffs = simplify_lines(PX, PY, poffs, tol)
+            PX, PY, PD = PX[keep], PY[keep], PD[keep]
+        # LineStringM WKB of all lines, M is data value
+        if gaps is not None:
+            wkbs = multilinestrings_m_wkb(PX, PY, PD, poffs, parts, ends)
+            npts = np.diff(poffs[parts])
+        else:
+            wkbs = linestrings_m_wkb(PX, PY, PD, poffs, ends)
+            npts = np.diff(poffs)
+        out.append((wkbs, npts, fills))
+    return out
+#=========================================================================================
+
+def merge_blocks(results):
+    ''' Merge the results of profile_block() on consecutive ranges of lines. '''
+    #
+    out = []
+    for nv in range(len(results[0])):
+        parts = [res[nv] for res in results]
+        wkbs  = [w for p in parts for w in p[0]]
+        npts  = np.concatenate([p[1] for p in parts])
+        fills = [(f[0][0], [w for fi in f for w in fi[1]],
+                  np.concatenate([fi[2] for fi in f]))
+                 for f in zip(*[p[2] for p in parts])]
+        out.append((wkbs, npts, fills))
+    return out
+#=========================================================================================
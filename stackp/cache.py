@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        begin                : 2026-10-18
+        copyright            : (C) 2019-2026 by GeoProc.com
+        email                : info@geoproc.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 3 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+  CACHE
+  Persistent cache of the line store of a layer, for fast re-runs
+
+  Two sidecar files are written next to the layer (or in the temporary folder
+  when the layer is not a writable file):
+      <layer>.<key>.stackp.bin: points of all lines, as stored (see
+                                linestore.record(): compact stores stay compact)
+      <layer>.<key>.stackp.npz: fingerprint, line names, offsets, number of data
+                                channels, line origins (compact) and statistics
+  key depends on the layer source and the fields read. The fingerprint adds
+  everything that invalidates the cache: time and size of the file and of its
+  companion files (SQLite -wal/-journal, shapefile .dbf/.shx), subset string, ...
+  Only layers stored in a file can be cached: the content of a memory layer, a
+  database or a web service cannot be checked without reading it all.
+
+WARNING: code formatting does not follow pycodestyle recommendations
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+
+from .linestore import LineStore
+
+VERSION = 4     # format of the cache, part of the fingerprint
+
+def _stamp(path):
+    ''' Time and size of a layer file and of the companion files whose changes the
+        file itself does not show: pending SQLite writes (GeoPackage, SpatiaLite),
+        attributes and index of a shapefile.
+    '''
+    #
+    base, ext = os.path.splitext(path)
+    files = [path, path + '-wal', path + '-journal']
+    if ext.lower() == '.shp':
+        files += [base + '.dbf', base + '.shx']
+    stamp = []
+    for fname in files:
+        if os.path.isfile(fname):
+            st = os.stat(fname)
+            stamp.append([fname[len(base):], st.st_mtime_ns, st.st_size])
+    return stamp
+#=========================================================================================
+
+def _sha1(items):
+    ''' Hexadecimal sha1 digest of the repr of a list of items. '''
+    #
+    return hashlib.sha1(repr(items).encode('utf-8')).hexdigest()
+#=========================================================================================
+
+class StoreCache():
+    ''' Cache of the line store of a layer.
+        source:  layer source (e.g. 'survey.gpkg|layername=mag')
+        fields:  names of the fields read (line, fiducial, data channels...)
+        extra:   any other value the store depends on (dummy value, selection...)
+        tmpdir:  folder used when the layer is not in a writable folder
+
+        enabled is False when the layer is not a file: load() and save() do nothing.
+    '''
+    #
+    def __init__(self, source, fields, extra, tmpdir):
+        path = source.split('|')[0]
+        key  = _sha1([source, list(fields)])[:8]
+        self.enabled = os.path.isfile(path)
+        stamp = _stamp(path) if self.enabled else []
+        self.fingerprint = _sha1([VERSION, source, list(fields), stamp, extra])
+        if self.enabled and os.access(os.path.dirname(os.path.abspath(path)), os.W_OK):
+            base = os.path.splitext(path)[0]
+        else:
+            base = os.path.join(tmpdir, 'stackp')
+        self.bin = '%s.%s.stackp.bin' % (base, key)
+        self.idx = '%s.%s.stackp.npz' % (base, key)
+    #-------------------------------------------------------------------------------------
+
+    def load(self):
+        ''' Return (store, stats) from the cache, (None, None) if the cache is missing
+            or out of date.
+        '''
+        #
+        if not (self.enabled and os.path.exists(self.bin) and os.path.exists(self.idx)):
+            return None, None
+        try:
+            with np.load(self.idx) as idx:
+                if str(idx['fingerprint']) != self.fingerprint:
+                    return None, None
+                store = LineStore.from_file(self.bin, idx['names'].tolist(),
+                                            idx['offsets'], int(idx['nch']),
+                                            idx['origin'] if idx['compact'] else None)
+                stats = json.loads(str(idx['stats']))
+        except (OSError, ValueError, KeyError):
+            return None, None
+        return store, stats
+    #-------------------------------------------------------------------------------------
+
+    def save(self, store, stats):
+        ''' Write store and stats (dictionary of floats) to the cache.
+            Return: True on success.
+        '''
+        #
+        if not self.enabled:
+            return False
+        try:
+            store.save(self.bin + '.tmp')
+            with open(self.idx + '.tmp', 'wb') as fo:
+                np.savez(fo, fingerprint=np.array(self.fingerprint),
+                         names=np.array([str(n) for n in store.names], dtype=str),
+                         offsets=store.offsets, nch=np.array(store.nch),
+                         compact=np.array(store.compact),
+                         origin=store.origin if store.compact else np.empty((0, 3)),
+                         stats=np.array(json.dumps(stats)))
+            os.replace(self.bin + '.tmp', self.bin)
+            os.replace(self.idx + '.tmp', self.idx)
+        except OSError:
+            return False
+        return True
+    #-------------------------------------------------------------------------------------
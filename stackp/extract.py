@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        begin                : 2026-10-18
+        copyright            : (C) 2019-2026 by GeoProc.com
+        email                : info@geoproc.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 3 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+  EXTRACT
+  Read point features into typed numpy arrays, chunk by chunk
+
+WARNING: code formatting does not follow pycodestyle recommendations
+"""
+
+import numpy as np
+from .wkb import points_from_wkb
+
+
+def to_array(values, dtype):
+    ''' Convert a list of attribute values to a numpy array of type dtype.
+        dtype None keeps the python objects (e.g. line names).
+        For float types, values that cannot be converted (NULL, text) become NaN.
+    '''
+    #
+    if dtype is None:
+        ar = np.empty(len(values), dtype=object)
+        ar[:] = values
+        return ar
+    try:
+        return np.array(values, dtype=dtype)
+    except (TypeError, ValueError):
+        if not np.issubdtype(dtype, np.floating):
+            raise
+    ar = np.empty(len(values), dtype=dtype)
+    for i, v in enumerate(values):
+        try:
+            ar[i] = float(v)
+        except (TypeError, ValueError):
+            ar[i] = np.nan
+    return ar
+#=========================================================================================
+
+class PointExtractor():
+    ''' Bulk reader of point features.
+        features: iterator of QgsFeature (any object with attributes(), hasGeometry()
+                  and geometry().asWkb() will do)
+        attr_ix:  indices of the attributes to extract
+        dtypes:   numpy type of each attribute (None: keep python objects)
+        geometry: decode point coordinates?
+        chunk:    number of features read per chunk
+
+        Iterating over the extractor yields (x, y, cols) per chunk of features:
+            x, y: point coordinates (float64, empty if geometry is False)
+            cols: one array per attribute in attr_ix, repeated for each point of
+                  multipoint features so that all arrays have the same length
+        Features without geometry are skipped when geometry is True.
+        The number of features read so far is available as the 'count' member.
+    '''
+    #
+    def __init__(self, features, attr_ix, dtypes, geometry=True, chunk=50000):
+        self.features = features
+        self.attr_ix  = list(attr_ix)
+        self.dtypes   = list(dtypes)
+        self.geometry = geometry
+        self.chunk    = max(1, int(chunk))
+        self.count    = 0
+    #-------------------------------------------------------------------------------------
+
+    def _make_chunk(self, vals, blobs):
+        ''' Convert collected attributes and geometries to arrays. '''
+        #
+        cols = [to_array(v, dt) for v, dt in zip(vals, self.dtypes)]
+        if not self.geometry:
+            e = np.empty(0)
+            return e, e.copy(), cols
+        x, y, counts = points_from_wkb(blobs)
+        if len(x) != len(blobs):
+            cols = [np.repeat(c, counts) for c in cols]
+        return x, y, cols
+    #-------------------------------------------------------------------------------------
+
+    def __iter__(self):
+        ''' Yield (x, y, cols) for each chunk of features. '''
+        #
+        ix    = self.attr_ix
+        vals  = [[] for i in ix]
+        blobs = []
+        n     = 0
+        for ft in self.features:
+            self.count += 1
+            if self.geometry:
+                if not ft.hasGeometry():
+                    continue
+                blobs.append(bytes(ft.geometry().asWkb()))
+            attrs = ft.attributes()
+            for v, i in zip(vals, ix):
+                v.append(attrs[i])
+            n += 1
+            if n == self.chunk:
+                yield self._make_chunk(vals, blobs)
+                vals  = [[] for i in ix]
+                blobs = []
+                n     = 0
+        if n:
+            yield self._make_chunk(vals, blobs)
+    #-------------------------------------------------------------------------------------
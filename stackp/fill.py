@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        begin                : 2026-10-18
+        copyright            : (C) 2019-2026 by GeoProc.com
+        email                : info@geoproc.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 3 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+  FILL
+  Wiggle-fill polygons between profiles and their base lines, for all lines of
+  a block at once
+
+WARNING: code formatting does not follow pycodestyle recommendations
+"""
+
+import numpy as np
+from .profile import line_index
+
+
+def wiggle_fill(PX, PY, Data, offsets, aziN, invs, dmean, mult, scale, thr=0., sign=1):
+    ''' Polygons between the profiles and their base lines where the data are above
+        (sign 1) or below (sign -1) dmean + thr.
+        The base line of a profile is the profile of the constant value dmean + thr:
+        the shift from profile to base line is along the normal of the line, so no
+        polygon overlay is needed. Crossings of the base line are found by linear
+        interpolation between consecutive points. NaN data break the polygons.
+        PX, PY:  profile coordinates (see build_profiles) of all lines
+        Data:    data of all lines
+        offsets: line i spans [offsets[i], offsets[i+1])
+        aziN, invs, dmean, mult, scale: as used to build the profiles
+
+        Return: x, y of the closed rings of all polygons, offsets of the rings
+                (ring j spans [roffs[j], roffs[j+1])) and line of each ring
+    '''
+    #
+    idx   = line_index(offsets)
+    theta = np.radians(aziN - 90.)
+    # Signed anomaly and profile to base line shift of every point
+    s   = sign * (Data - dmean - thr)
+    amp = invs[idx] * scale * mult * (Data - dmean - thr)
+    BX  = PX - amp * np.sin(theta)[idx]
+    BY  = PY - amp * np.cos(theta)[idx]
+
+    # Insert crossing points (on the base line: s = 0) between points of
+    # opposite signs of the same line
+    same = idx[1:] == idx[:-1]
+    with np.errstate(invalid='ignore'):
+        cr = np.flatnonzero(same & (s[:-1] * s[1:] < 0.))
+    t  = s[cr] / (s[cr] - s[cr+1])
+    cx = PX[cr] + t * (PX[cr+1] - PX[cr])
+    cy = PY[cr] + t * (PY[cr+1] - PY[cr])
+    ax, ay = np.insert(PX, cr + 1, cx), np.insert(PY, cr + 1, cy)
+    bx, by = np.insert(BX, cr + 1, cx), np.insert(BY, cr + 1, cy)
+    As     = np.insert(s, cr + 1, 0.)
+    Ai     = np.insert(idx, cr + 1, idx[cr])
+
+    # Runs of positive points, extended to the crossing points (or points right
+    # on the base line) around them
+    with np.errstate(invalid='ignore'):
+        pos = As > 0.
+    sam = Ai[1:] == Ai[:-1]
+    ins = pos.copy()
+    ins[:-1] |= pos[1:] & sam & (As[:-1] == 0.)
+    ins[1:]  |= pos[:-1] & sam & (As[1:] == 0.)
+    brk = np.ones(len(As), dtype=bool)
+    brk[1:] = ~(ins[:-1] & sam)
+    first = ins & brk
+    a  = np.flatnonzero(first)
+    nr = np.bincount(np.cumsum(first)[ins] - 1, minlength=len(a))
+    # Ring: profile a..a+n-1, base a+n-1..a, back to profile a. Base points of the
+    # crossing points are the crossing points themselves: skip them
+    tot = 2 * nr + 1
+    rid = np.repeat(np.arange(len(a)), tot)
+    k   = np.arange(tot.sum()) - np.repeat(np.cumsum(tot) - tot, tot)
+    nn, aa = nr[rid], a[rid]
+    src = np.where(k < nn, aa + k, np.where(k < 2 * nn, aa + 2 * nn - 1 - k, aa))
+    isb = (k >= nn) & (k < 2 * nn)
+    ok  = ~(isb & (As[src] == 0.))
+    rid, src, isb = rid[ok], src[ok], isb[ok]
+    x = np.where(isb, bx[src], ax[src])
+    y = np.where(isb, by[src], ay[src])
+    roffs = np.r_[0, np.cumsum(np.bincount(rid, minlength=len(a)))]
+    # Drop degenerate rings (less than 3 distinct points)
+    good = np.diff(roffs) >= 4
+    if not good.all():
+        keep = np.repeat(good, np.diff(roffs))
+        x, y = x[keep], y[keep]
+        roffs = np.r_[0, np.cumsum(np.diff(roffs)[good])]
+        a = a[good]
+    return x, y, roffs, Ai[a]
+#=========================================================================================
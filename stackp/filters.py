@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        begin                : 2026-10-18
+        copyright            : (C) 2019-2026 by GeoProc.com
+        email                : info@geoproc.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 3 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+  FILTERS
+  Along-line filters of the data of all lines of a block at once: running mean,
+  running median (despike) and FFT low-pass. Filters never cross line ends and
+  NaN (dummy values) stay NaN.
+
+WARNING: code formatting does not follow pycodestyle recommendations
+"""
+
+import warnings
+import numpy as np
+from .profile import line_index
+
+FILTERS = ['none', 'mean', 'median', 'lowpass']
+
+
+def _bounds(offsets):
+    ''' First and last+1 index of the line of every point. '''
+    #
+    idx = line_index(offsets)
+    return offsets[:-1][idx], offsets[1:][idx]
+#=========================================================================================
+
+def running_mean(Data, offsets, width):
+    ''' Running mean over width points (centred, shorter at line ends). '''
+    #
+    n  = len(Data)
+    h  = int(width) // 2
+    s, e = _bounds(offsets)
+    i  = np.arange(n)
+    lo, hi = np.maximum(i - h, s), np.minimum(i + h + 1, e)
+    ok = ~np.isnan(Data)
+    m  = Data[ok].mean() if ok.any() else 0.
+    # Sums of the window from cumulative sums (centred values: better precision)
+    C  = np.r_[0., np.cumsum(np.where(ok, Data - m, 0.))]
+    N  = np.r_[0, np.cumsum(ok)]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = (C[hi] - C[lo]) / (N[hi] - N[lo]) + m
+    out[~ok] = np.nan
+    return out
+#=========================================================================================
+
+def running_median(Data, offsets, width, chunk=1000000):
+    ''' Running median over width points (centred, shorter at line ends): removes
+        spikes shorter than half the window. Processed by chunks of about chunk
+        values to bound memory use.
+    '''
+    #
+    n   = len(Data)
+    h   = int(width) // 2
+    s, e = _bounds(offsets)
+    k   = np.arange(-h, h + 1)
+    out = np.empty(n)
+    step = max(1, chunk // len(k))
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)    # all-NaN windows
+        for c0 in range(0, n, step):
+            c1  = min(n, c0 + step)
+            i   = np.arange(c0, c1)[:, None] + k
+            win = Data[np.clip(i, 0, n - 1)]
+            win[(i < s[c0:c1, None]) | (i >= e[c0:c1, None])] = np.nan
+            out[c0:c1] = np.nanmedian(win, axis=1)
+    out[np.isnan(Data)] = np.nan
+    return out
+#=========================================================================================
+
+def _fill_nan(Data, offsets):
+    ''' Data with NaN replaced by linear interpolation between the valid values of
+        the same line (nearest valid value at line ends). Lines without any valid
+        value are left NaN.
+    '''
+    #
+    n  = len(Data)
+    ok = ~np.isnan(Data)
+    if ok.all():
+        return Data
+    s, e = _bounds(offsets)
+    i  = np.arange(n)
+    # Previous and next valid point, within the line
+    prv = np.maximum.accumulate(np.where(ok, i, -1))
+    nxt = np.minimum.accumulate(np.where(ok, i, n)[::-1])[::-1]
+    hp  = prv >= s
+    hn  = nxt < e
+    vp  = Data[np.clip(prv, 0, n - 1)]
+    vn  = Data[np.clip(nxt, 0, n - 1)]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = (i - prv) / (nxt - prv)
+    out = np.where(hp & hn, vp + t * (vn - vp), np.where(hp, vp, vn))
+    out[~(hp | hn)] = np.nan
+    return np.where(ok, Data, out)
+#=========================================================================================
+
+def lowpass(Data, offsets, wavelength, order=4):
+    ''' Zero phase FFT low-pass filter (Butterworth response of given order), cut-off
+        wavelength in number of points. Every line is detrended (end to end) and
+        zero padded; lines of similar padded length are filtered together, as the
+        rows of one 2D FFT.
+    '''
+    #
+    out  = np.array(Data, dtype=np.float64)
+    full = _fill_nan(out, offsets)
+    nl   = np.diff(offsets)
+    L    = 2 ** np.ceil(np.log2(np.maximum(2 * nl, 2))).astype(np.int64)
+    for pl in np.unique(L[nl >= 4]):
+        sel  = np.flatnonzero((L == pl) & (nl >= 4))
+        nsel = nl[sel]
+        rows = np.repeat(np.arange(len(sel)), nsel)
+        cols = np.arange(nsel.sum()) - np.repeat(np.cumsum(nsel) - nsel, nsel)
+        src  = np.repeat(offsets[:-1][sel], nsel) + cols
+        # Remove end to end trend of every line
+        v0   = full[offsets[:-1][sel]]
+        v1   = full[offsets[1:][sel] - 1]
+        good = ~(np.isnan(v0) | np.isnan(v1))
+        trend = (v0[rows] + (v1 - v0)[rows] * cols / (nsel[rows] - 1))
+        M = np.zeros((len(sel), pl))
+        M[rows, cols] = full[src] - trend
+        M[~good] = 0.
+        f = np.fft.rfftfreq(pl) * wavelength
+        M = np.fft.irfft(np.fft.rfft(M, axis=1) / np.sqrt(1. + f ** (2 * order)), pl,
+                         axis=1)
+        out[src] = M[rows, cols] + trend
+    out[np.isnan(Data)] = np.nan
+    return out
+#=========================================================================================
+
+def filter_lines(Data, offsets, kind, width):
+    ''' Filter the data of all lines.
+        kind:  'none', 'mean', 'median' or 'lowpass' (see FILTERS)
+        width: window (running mean and median) or cut-off wavelength (low-pass),
+               in number of points
+
+        Return: filtered data (new array), or Data itself for 'none'
+    '''
+    #
+    if kind == 'none' or width < 2 or len(Data) == 0:
+        return Data
+    if kind == 'mean':
+        return running_mean(Data, offsets, width)
+    if kind == 'median':
+        return running_median(Data, offsets, width)
+    if kind == 'lowpass':
+        return lowpass(Data, offsets, width)
+    raise ValueError('Unknown filter: %s' % kind)
+#=========================================================================================
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        begin                : 2026-10-18
+        copyright            : (C) 2019-2026 by GeoProc.com
+        email                : info@geoproc.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 3 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+  INCREMENTAL
+  Per-line content hashes of a previous output, to re-write only the lines that
+  changed
+
+  One sidecar file is written next to the output file:
+      <output>.stackp.json: global key, hash of every line of the output and
+                            time and size of the output file
+  The global key covers everything shared by all lines (fields, scaling, display
+  parameters...): when it changes, all lines have to be re-written. So they are
+  if the output file was modified by anything else.
+
+WARNING: code formatting does not follow pycodestyle recommendations
+"""
+
+import os
+import json
+import hashlib
+
+VERSION = 1     # format of the sidecar file, part of the global key
+
+
+def global_key(items):
+    ''' Hexadecimal blake2b digest of a list of items (json serialisable). '''
+    #
+    return hashlib.blake2b(json.dumps([VERSION, items], sort_keys=True).encode('utf-8'),
+                           digest_size=16).hexdigest()
+#=========================================================================================
+
+def line_hashes(X, Y, FID, Data, offsets, extra=None):
+    ''' Hexadecimal blake2b digest of every line: coordinates, fiducials and data.
+        X, Y, FID, Data: concatenated arrays of all lines
+        offsets:         line i spans [offsets[i], offsets[i+1])
+        extra:           None, or one more value per line hashed with it (e.g.
+                         its type and direction)
+
+        Return: list of strings, one per line
+    '''
+    #
+    hashes = []
+    for i, (s, e) in enumerate(zip(offsets[:-1], offsets[1:])):
+        h = hashlib.blake2b(digest_size=16)
+        for a in (X, Y, FID, Data):
+            h.update(a[s:e].tobytes())
+        if extra is not None:
+            h.update(repr(extra[i]).encode('utf-8'))
+        hashes.append(h.hexdigest())
+    return hashes
+#=========================================================================================
+
+def _stamp(fname):
+    ''' Time and size of a file, None if missing. '''
+    #
+    try:
+        st = os.stat(fname)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+#=========================================================================================
+
+class LineIndex():
+    ''' Line hashes of an output file, kept in a sidecar file.
+        fname: output file
+    '''
+    #
+    def __init__(self, fname):
+        self.output = fname
+        self.fname  = fname + '.stackp.json'
+    #-------------------------------------------------------------------------------------
+
+    def load(self, key):
+        ''' Return the dictionary {line key: hash} of the previous output, None if
+            missing, written with another global key or if the output file changed.
+        '''
+        #
+        try:
+            with open(self.fname, 'r') as fi:
+                idx = json.load(fi)
+        except (OSError, ValueError):
+            return None
+        if idx.get('key') != key or idx.get('stamp') != _stamp(self.output):
+            return None
+        return idx.get('lines', {})
+    #-------------------------------------------------------------------------------------
+
+    def save(self, key, lines):
+        ''' Write the global key and the line hashes, once the output file is closed.
+            Return: True on success.
+        '''
+        #
+        try:
+            with open(self.fname + '.tmp', 'w') as fo:
+                json.dump({'key':key, 'stamp':_stamp(self.output), 'lines':lines}, fo)
+            os.replace(self.fname + '.tmp', self.fname)
+        except OSError:
+            return False
+        return True
+    #-------------------------------------------------------------------------------------
+
+    def remove(self):
+        ''' Delete the sidecar file (output re-written from scratch). '''
+        #
+        if os.path.exists(self.fname):
+            try:
+                os.remove(self.fname)
+            except OSError:
+                pass
+    #-------------------------------------------------------------------------------------
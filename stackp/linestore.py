@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        begin                : 2026-10-18
+        copyright            : (C) 2019-2026 by GeoProc.com
+        email                : info@geoproc.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 3 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+  LINESTORE
+  Columnar store of survey lines, in memory or spilled to a memory-mapped file
+
+WARNING: code formatting does not follow pycodestyle recommendations
+"""
+
+import os
+import sys
+import numpy as np
+
+RECORD = np.dtype([('X', 'f8'), ('Y', 'f8'), ('FID', 'i8'), ('Data', 'f8')])
+# Compact mode: offsets from the origin of the line (first point seen)
+COMPACT = np.dtype([('X', 'f4'), ('Y', 'f4'), ('FID', 'i4'), ('Data', 'f4')])
+
+
+def record(nch=1, compact=False):
+    ''' Record of a point with nch data channels (Data field of shape (nch,) if
+        nch > 1): RECORD or COMPACT for a single channel.
+    '''
+    #
+    rec = COMPACT if compact else RECORD
+    if nch == 1:
+        return rec
+    return np.dtype([(k, rec[k]) for k in ('X', 'Y', 'FID')] +
+                    [('Data', rec['Data'], (nch,))])
+#=========================================================================================
+
+
+class LineStore():
+    ''' Columnar store of survey lines.
+        All points of all lines are kept in 4 contiguous arrays: X, Y, FID and Data.
+        Line i (name: names[i]) spans [offsets[i], offsets[i+1]) in those arrays,
+        sorted by fiducial. Lines are kept in the order they are first seen.
+        Data has one column per data channel (shape (n, nch)) if nch > 1: the
+        coordinates are shared by all channels, NaN marks the dummy values of a
+        channel. channel() gives the lines of one channel without its dummies.
+
+        Points are partitioned by line id as they come: the features of a line
+        do not need to be contiguous in the layer, no pre-sort is needed.
+
+        spill: None to keep everything in memory, or name of a scratch file.
+               In the latter case (out-of-core mode) points are buffered per line
+               and written to the file by chunks; the arrays are then read-only
+               views on a numpy.memmap of that file: memory use is bounded by the
+               buffers and the largest line, not by the survey.
+        budget: max. number of points buffered in memory before writing them to
+                the scratch file (out-of-core mode only)
+        compact: if True, X, Y and FID are stored as float32/int32 offsets from a
+                 per-line origin (its first point seen) and Data as float32: 16
+                 bytes per point instead of 32. Within a line of 100 km, the
+                 coordinates keep a precision of about 1 cm.
+                 block() and line() still return float64/int64 arrays.
+        nch: number of data channels
+
+        Usage: append() points, then finalize().
+               close() releases the arrays and deletes the scratch file.
+               Read the lines with block() or line().
+    '''
+    #
+    def __init__(self, spill=None, budget=4000000, compact=False, nch=1):
+        self.spill   = spill
+        self.budget  = budget
+        self.compact = compact
+        self.nch     = nch
+        self._rec    = record(nch, compact)
+        self._fo     = open(spill, 'wb') if spill else None
+        self._codes  = {}       # line id -> line number, in order of appearance
+        self._chunks = []       # in memory: (line numbers, X, Y, FID, Data)
+        self._buf    = {}       # out-of-core: line number -> list of records
+        self._nbuf   = 0
+        self._index  = []       # out-of-core: (line number, count) of each chunk in file
+        self._n      = 0
+        self.names   = []
+        self._origin = []       # compact mode: (X, Y, FID) of the origin of each line
+        self.X = self.Y = self.FID = self.Data = None
+        self.origin  = None
+        self.offsets = None
+        self._valid  = None     # valid (not NaN) points of each line and channel
+        self._mm     = None     # memmap of the scratch (or cache) file
+    #-------------------------------------------------------------------------------------
+
+    def __len__(self):
+        ''' Number of lines in the store. '''
+        #
+        return len(self.names)
+    #-------------------------------------------------------------------------------------
+
+    def _line_numbers(self, lid, x, y, fid):
+        ''' Line number of every point. Dictionary lookups are only done once per run
+            of identical line ids, so contiguous lines cost next to nothing.
+            x, y, fid: first point of a new line is its origin (compact mode)
+        '''
+        #
+        brk = np.flatnonzero(lid[1:] != lid[:-1]) + 1
+        starts = np.r_[0, brk]
+        codes = np.empty(len(starts), dtype=np.int64)
+        for i, s in enumerate(starts):
+            c = self._codes.get(lid[s])
+            if c is None:
+                c = self._codes[lid[s]] = len(self.names)
+                self.names.append(lid[s])
+                self._origin.append((x[s], y[s], fid[s]))
+            codes[i] = c
+        return np.repeat(codes, np.diff(np.r_[starts, len(lid)]))
+    #-------------------------------------------------------------------------------------
+
+    def append(self, lid, x, y, fid, data):
+        ''' Add points (numpy arrays of equal length) to the store.
+            lid: line id of every point (any hashable value, e.g. object array)
+            data: shape (n, nch) if nch > 1, NaN for dummy values
+        '''
+        #
+        n = len(x)
+        if n == 0:
+            return
+        codes = self._line_numbers(lid, x, y, fid)
+        self._n += n
+        if self.compact:
+            # Offsets from the origin of the line
+            org = np.array(self._origin, dtype=np.float64)
+            x   = np.asarray(x, dtype=np.float64) - org[codes, 0]
+            y   = np.asarray(y, dtype=np.float64) - org[codes, 1]
+            fid = np.asarray(fid, dtype=np.int64) - org[codes, 2].astype(np.int64)
+            if len(fid) and max(-fid.min(), fid.max()) >= 2**31:
+                raise ValueError('Fiducial range of a line too large for compact mode')
+        if self._fo is None:
+            dt = self._rec
+            self._chunks.append((codes,
+                                 np.asarray(x, dtype=dt['X']),
+                                 np.asarray(y, dtype=dt['Y']),
+                                 np.asarray(fid, dtype=dt['FID']),
+                                 np.asarray(data, dtype=dt['Data'].base)))
+            return
+        rec = np.empty(n, dtype=self._rec)
+        rec['X'], rec['Y'], rec['FID'], rec['Data'] = x, y, fid, data
+        brk = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+        for s, e in zip(np.r_[0, brk], np.r_[brk, n]):
+            self._buf.setdefault(codes[s], []).append(rec[s:e])
+        self._nbuf += n
+        if self._nbuf >= self.budget:
+            self._flush()
+    #-------------------------------------------------------------------------------------
+
+    def _flush(self):
+        ''' Write the buffered points to the scratch file, one chunk per line. '''
+        #
+        for code in sorted(self._buf):
+            rec = np.concatenate(self._buf[code])
+            rec.tofile(self._fo)
+            self._index.append((code, len(rec)))
+        self._buf  = {}
+        self._nbuf = 0
+    #-------------------------------------------------------------------------------------
+
+    def finalize(self):
+        ''' Make the X, Y, FID and Data arrays, every line sorted by fiducial. '''
+        #
+        nl = len(self.names)
+        self.origin = np.array(self._origin, dtype=np.float64).reshape(-1, 3)
+        self._origin = []
+        if self._fo is not None:
+            self._finalize_spill()
+            return
+        if self._chunks:
+            code, X, Y, FID, Data = [np.concatenate(c) for c in zip(*self._chunks)]
+        else:
+            code = np.empty(0, dtype=np.int64)
+            X, Y, FID, Data = self._empty()
+        self._chunks = []
+        self.offsets = np.r_[0, np.cumsum(np.bincount(code, minlength=nl))]
+        # One sort for all: by line, then by fiducial
+        order = np.lexsort((FID, code))
+        del code
+        self.X, self.Y = X[order], Y[order]
+        self.FID, self.Data = FID[order], Data[order]
+    #-------------------------------------------------------------------------------------
+
+    def _finalize_spill(self):
+        ''' Out-of-core: make every line contiguous in the scratch file and sorted by
+            fiducial, then map the file in memory.
+        '''
+        #
+        self._flush()
+        self._fo.close()
+        self._fo = None
+        index = np.array(self._index, dtype=np.int64).reshape(-1, 2)
+        self._index = []
+        counts = np.bincount(index[:, 0], weights=index[:, 1],
+                             minlength=len(self.names)).astype(np.int64)
+        self.offsets = np.r_[0, np.cumsum(counts)]
+        if self._n == 0:
+            self.X, self.Y, self.FID, self.Data = self._empty()
+            return
+        if (np.diff(index[:, 0]) >= 0).all():
+            # Lines are already contiguous: sort each line in place
+            mm = np.memmap(self.spill, dtype=self._rec, mode='r+', shape=(self._n,))
+            for s, e in zip(self.offsets[:-1], self.offsets[1:]):
+                mm[s:e] = mm[s:e][np.argsort(mm['FID'][s:e], kind='stable')]
+            mm.flush()
+            mm._mmap.close()
+            del mm
+        else:
+            # Interleaved lines: gather the chunks of each line in a new file
+            src = np.memmap(self.spill, dtype=self._rec, mode='r', shape=(self._n,))
+            starts = np.r_[0, np.cumsum(index[:, 1])]
+            order  = np.argsort(index[:, 0], kind='stable')
+            nchunk = np.bincount(index[:, 0], minlength=len(self.names))
+            bounds = np.r_[0, np.cumsum(nchunk)]
+            sorted_spill = self.spill + '.sorted'
+            with open(sorted_spill, 'wb') as fo:
+                for l in range(len(self.names)):
+                    rec = np.concatenate([src[starts[k]:starts[k+1]]
+                                          for k in order[bounds[l]:bounds[l+1]]])
+                    rec[np.argsort(rec['FID'], kind='stable')].tofile(fo)
+            src._mmap.close()
+            del src
+            os.remove(self.spill)
+            self.spill = sorted_spill
+        self._mm = np.memmap(self.spill, dtype=self._rec, mode='r', shape=(self._n,))
+        self.X, self.Y, self.FID, self.Data = [self._mm[k] for k in self._rec.names]
+    #-------------------------------------------------------------------------------------
+
+    def _empty(self):
+        ''' Empty X, Y, FID and Data arrays. '''
+        #
+        return [np.empty((0,) + self._rec[k].shape, dtype=self._rec[k].base)
+                for k in self._rec.names]
+    #-------------------------------------------------------------------------------------
+
+    def save(self, fname):
+        ''' Write all points, line after line, as binary records to file fname, as
+            stored: compact records (offsets from the line origins) in compact mode.
+        '''
+        #
+        with open(fname, 'wb') as fo:
+            for l0, l1 in self.groups(self.budget):
+                s, e = self.offsets[l0], self.offsets[l1]
+                rec = np.empty(e - s, dtype=self._rec)
+                for k in self._rec.names:
+                    rec[k] = getattr(self, k)[s:e]
+                rec.tofile(fo)
+    #-------------------------------------------------------------------------------------
+
+    @classmethod
+    def from_file(cls, fname, names, offsets, nch=1, origin=None):
+        ''' Return a finalized store mapped on a file written by save().
+            names, offsets, nch: line names, offsets and channels of the saved store
+            origin: origin of every line of a compact store (None: not compact)
+        '''
+        #
+        store = cls(compact=origin is not None, nch=nch)
+        if origin is not None:
+            store.origin = np.asarray(origin, dtype=np.float64).reshape(-1, 3)
+        store.names   = list(names)
+        store.offsets = np.asarray(offsets, dtype=np.int64)
+        store._n      = int(store.offsets[-1])
+        if store._n:
+            store._mm = np.memmap(fname, dtype=store._rec, mode='r', shape=(store._n,))
+            store.X, store.Y, store.FID, store.Data = [store._mm[k]
+                                                       for k in store._rec.names]
+        else:
+            store.X, store.Y, store.FID, store.Data = store._empty()
+        return store
+    #-------------------------------------------------------------------------------------
+
+    def close(self):
+        ''' Release the arrays, unmap the file and delete the scratch file, if any.
+            Views returned by block() must be released before: a mapped file
+            cannot be deleted on Windows.
+            Return: True on success, False if the scratch file is left behind.
+        '''
+        #
+        self.X = self.Y = self.FID = self.Data = None
+        self._chunks = []
+        self._valid  = None
+        if self._mm is not None:
+            mm, self._mm = self._mm._mmap, None
+            # Every view on the file refers to its mmap: unmap only if none is left
+            # (closing it under a view would crash on the next access)
+            if sys.getrefcount(mm) <= 2:
+                mm.close()
+            del mm
+        if self._fo is not None:
+            self._fo.close()
+            self._fo = None
+        if self.spill and os.path.exists(self.spill):
+            try:
+                os.remove(self.spill)
+            except OSError:
+                return False
+        return True
+    #-------------------------------------------------------------------------------------
+
+    def line(self, i):
+        ''' Return views (X, Y, FID, Data) on line i. No copy is made, except in
+            compact mode.
+        '''
+        #
+        return self.block(i, i + 1)[:4]
+    #-------------------------------------------------------------------------------------
+
+    def block(self, l0, l1):
+        ''' Return views (X, Y, FID, Data) on lines l0 to l1-1 and their offsets,
+            relative to the first point of line l0. No copy is made, except in
+            compact mode: float64/int64 arrays are then rebuilt for the block.
+        '''
+        #
+        s, e = self.offsets[l0], self.offsets[l1]
+        offs = self.offsets[l0:l1+1] - s
+        if not self.compact:
+            return self.X[s:e], self.Y[s:e], self.FID[s:e], self.Data[s:e], offs
+        org = np.repeat(self.origin[l0:l1], np.diff(offs), axis=0)
+        return (self.X[s:e] + org[:, 0], self.Y[s:e] + org[:, 1],
+                self.FID[s:e] + org[:, 2].astype(np.int64),
+                self.Data[s:e].astype(np.float64), offs)
+    #-------------------------------------------------------------------------------------
+
+    def groups(self, max_points=None):
+        ''' Yield (l0, l1): ranges of consecutive lines having at most max_points
+            points (a single line longer than that makes its own range).
+            max_points None: all lines in one range.
+        '''
+        #
+        nl = len(self)
+        if not max_points:
+            if nl:
+                yield 0, nl
+            return
+        l0 = 0
+        while l0 < nl:
+            l1 = np.searchsorted(self.offsets, self.offsets[l0] + max_points, 'right') - 1
+            l1 = min(max(l1, l0 + 1), nl)
+            yield l0, l1
+            l0 = l1
+    #-------------------------------------------------------------------------------------
+
+    def valid(self):
+        ''' Number of valid (not NaN) data values of every line in every channel:
+            array (lines, nch), computed once, by blocks of lines.
+        '''
+        #
+        if self._valid is None:
+            counts = [np.zeros((0, self.nch), dtype=np.int64)]
+            for l0, l1 in self.groups(self.budget):
+                _, _, _, D, offs = self.block(l0, l1)
+                ok = ~np.isnan(D.reshape(len(D), self.nch))
+                cs = np.concatenate((np.zeros((1, self.nch), dtype=np.int64),
+                                     np.cumsum(ok, axis=0)))
+                counts.append(cs[offs[1:]] - cs[offs[:-1]])
+            self._valid = np.concatenate(counts)
+        return self._valid
+    #-------------------------------------------------------------------------------------
+
+    def channel(self, k, drop_nan=True):
+        ''' Lines of data channel k, read-only, with the block() and groups() of a
+            store. drop_nan: leave out the dummy (NaN) values of the channel and the
+            lines without valid value (False: all points and lines).
+        '''
+        #
+        return ChannelView(self, k, drop_nan)
+    #-------------------------------------------------------------------------------------
+
+class ChannelView():
+    ''' The lines of one data channel of a LineStore (see LineStore.channel()).
+        lines: line of the store of every line of the view (None: the same lines)
+        names, offsets: as in LineStore, for the points of the view
+    '''
+    #
+    def __init__(self, store, k, drop_nan=True):
+        self.store = store
+        self.k     = k
+        self.lines = None
+        self.names = store.names
+        self.offsets = store.offsets
+        if drop_nan:
+            counts = store.valid()[:, k]
+            if (counts != np.diff(store.offsets)).any():
+                self.lines   = np.flatnonzero(counts)
+                self.names   = [store.names[i] for i in self.lines]
+                self.offsets = np.r_[0, np.cumsum(counts[self.lines])]
+    #-------------------------------------------------------------------------------------
+
+    def __len__(self):
+        ''' Number of lines in the view. '''
+        #
+        return len(self.names)
+    #-------------------------------------------------------------------------------------
+
+    def block(self, l0, l1):
+        ''' Return (X, Y, FID, Data) of lines l0 to l1-1 of the view and their offsets,
+            relative to the first point of line l0: views on the store if no point
+            is left out, copies else.
+        '''
+        #
+        if self.lines is None:
+            X, Y, F, D, offs = self.store.block(l0, l1)
+            return X, Y, F, D if D.ndim == 1 else D[:, self.k], offs
+        # Lines of the store left out in between have no valid point
+        X, Y, F, D, _ = self.store.block(self.lines[l0], self.lines[l1-1] + 1)
+        D  = D if D.ndim == 1 else D[:, self.k]
+        ok = ~np.isnan(D)
+        return (X[ok], Y[ok], F[ok], D[ok],
+                self.offsets[l0:l1+1] - self.offsets[l0])
+    #-------------------------------------------------------------------------------------
+
+    groups = LineStore.groups
+    #-------------------------------------------------------------------------------------
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        begin                : 2026-10-18
+        copyright            : (C) 2019-2026 by GeoProc.com
+        email                : info@geoproc.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 3 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+  OGROUT
+  Bulk writer of WKB features to a GeoPackage or FlatGeobuf file through OGR:
+  large explicit transactions, spatial index built once all features are in.
+
+WARNING: code formatting does not follow pycodestyle recommendations
+"""
+
+import os
+has_ogr = False
+try:
+    from osgeo import ogr, osr
+    has_ogr = True
+except ImportError:
+    pass
+
+DRIVERS = {'.gpkg':'GPKG', '.fgb':'FlatGeobuf'}
+
+
+class OgrWriter():
+    ''' Write features given as (WKB, attributes) to a new GeoPackage or FlatGeobuf
+        file (the driver is chosen from the file extension).
+        fname:      output file, overwritten if it exists
+        layer_name: name of the layer in the file
+        geom_type:  ISO WKB geometry type of the layer (e.g. 2002: LineStringM)
+        fields:     list of (name, kind, width, precision), kind being 'String',
+                    'Integer' or 'Real'
+        crs_wkt:    WKT of the coordinate reference system ('' if unknown)
+        batch:      number of features per transaction (GeoPackage)
+        update:     if True and the file exists, open the layer to update it
+                    instead (incremental mode); fields and geometry type must match
+
+        GeoPackage: features are inserted in transactions of batch features and
+                    the R-tree spatial index is created once, in close().
+        FlatGeobuf: the driver builds its packed spatial index when the file is
+                    closed.
+    '''
+    #
+    def __init__(self, fname, layer_name, geom_type, fields, crs_wkt='', batch=50000,
+                 update=False):
+        if not has_ogr:
+            raise ModuleNotFoundError('osgeo (GDAL/OGR python bindings) is required')
+        drv_name = DRIVERS.get(os.path.splitext(fname)[1].lower())
+        if drv_name is None:
+            raise ValueError('Unsupported output format: %s (.gpkg or .fgb)' % fname)
+        self.fname  = fname
+        self.batch  = batch
+        self.gpkg   = drv_name == 'GPKG'
+        self.count  = 0
+        self._n     = 0
+        self.update = update and os.path.exists(fname)
+        if self.update:
+            self._ds  = ogr.Open(fname, 1)
+            self._lyr = self._ds.GetLayerByName(layer_name) if self._ds else None
+            if self._lyr is None:
+                raise IOError('Cannot update layer %s of %s' % (layer_name, fname))
+            self._defn  = self._lyr.GetLayerDefn()
+            self._trans = self._ds.TestCapability(ogr.ODsCTransactions)
+            self._begin()
+            return
+        drv = ogr.GetDriverByName(drv_name)
+        if os.path.exists(fname):
+            drv.DeleteDataSource(fname)
+        self._ds    = drv.CreateDataSource(fname)
+        if self._ds is None:
+            raise IOError('Cannot create %s' % fname)
+        srs = None
+        if crs_wkt:
+            srs = osr.SpatialReference()
+            srs.ImportFromWkt(crs_wkt)
+            srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        # Spatial index: deferred for GeoPackage, always built at the end for FlatGeobuf
+        opts = ['SPATIAL_INDEX=NO'] if self.gpkg else ['SPATIAL_INDEX=YES']
+        self._lyr = self._ds.CreateLayer(layer_name, srs, geom_type, opts)
+        kinds = {'String':ogr.OFTString, 'Integer':ogr.OFTInteger, 'Real':ogr.OFTReal}
+        for name, kind, width, prec in fields:
+            fd = ogr.FieldDefn(name, kinds[kind])
+            fd.SetWidth(width)
+            fd.SetPrecision(prec)
+            self._lyr.CreateField(fd)
+        self._defn  = self._lyr.GetLayerDefn()
+        self._trans = self._ds.TestCapability(ogr.ODsCTransactions)
+        self._begin()
+    #-------------------------------------------------------------------------------------
+
+    def _begin(self):
+        ''' Start a transaction, if supported by the driver. '''
+        #
+        if self._trans:
+            self._ds.StartTransaction()
+    #-------------------------------------------------------------------------------------
+
+    def _commit(self):
+        ''' Commit the current transaction, if supported by the driver. '''
+        #
+        if self._trans:
+            self._ds.CommitTransaction()
+    #-------------------------------------------------------------------------------------
+
+    def add_features(self, features):
+        ''' Add features: iterable of (WKB bytes, list of attribute values). '''
+        #
+        for wkb, attrs in features:
+            feat = ogr.Feature(self._defn)
+            for i, v in enumerate(attrs):
+                feat.SetField(i, v)
+            feat.SetGeometryDirectly(ogr.CreateGeometryFromWkb(bytes(wkb)))
+            self._lyr.CreateFeature(feat)
+            self._n += 1
+            if self._n >= self.batch:
+                self._commit()
+                self._begin()
+                self._n = 0
+        self.count += len(features)
+    #-------------------------------------------------------------------------------------
+
+    def delete(self, field, values, where=''):
+        ''' Delete the features having field in values (and matching the optional
+            SQL condition where). GeoPackage only.
+        '''
+        #
+        values = list(values)
+        name = self._lyr.GetName()
+        for i in range(0, len(values), 500):
+            lst = ','.join("'%s'" % str(v).replace("'", "''") for v in values[i:i+500])
+            sql = 'DELETE FROM "%s" WHERE "%s" IN (%s)' % (name, field, lst)
+            if where:
+                sql += ' AND (%s)' % where
+            self._ds.ExecuteSQL(sql)
+    #-------------------------------------------------------------------------------------
+
+    def close(self):
+        ''' Commit the last transaction, build the spatial index and close the file. '''
+        #
+        if self._ds is None:
+            return
+        self._commit()
+        if self.gpkg and self.count and not self.update:
+            # One bulk R-tree load instead of an update per insert
+            self._ds.ExecuteSQL("SELECT CreateSpatialIndex('%s', '%s')" %
+                                (self._lyr.GetName(), self._lyr.GetGeometryColumn()))
+        self._lyr = None
+        self._defn = None
+        self._ds = None
+    #-------------------------------------------------------------------------------------
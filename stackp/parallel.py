@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        begin                : 2026-10-18
+        copyright            : (C) 2019-2026 by GeoProc.com
+        email                : info@geoproc.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 3 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+  PARALLEL
+  Output features of a block of lines computed on a pool of worker processes.
+  The arrays of the block are copied once to shared memory, whatever the number
+  of display variants: workers receive the range of lines they have to process
+  and do all the work on them (filter, profiles, fill, decimation, WKB). Only the
+  WKB of the features come back.
+
+WARNING: code formatting does not follow pycodestyle recommendations
+"""
+
+import os
+import sys
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+
+from .block import profile_block, merge_blocks
+
+# Below that, shipping a block to the workers costs more than it saves. Kept under the
+# block size of the out-of-core and compact modes (2 10^6 points) so that they use them.
+MIN_POINTS = 1000000
+
+
+def python_executable():
+    ''' Return the python interpreter to use for the workers.
+        Inside QGIS sys.executable is the QGIS application, not python.
+    '''
+    #
+    exe = sys.executable
+    if exe and os.path.basename(exe).lower().startswith('python'):
+        return exe
+    for the_exe in (os.path.join(sys.exec_prefix, 'pythonw.exe'),
+                    os.path.join(sys.exec_prefix, 'python.exe'),
+                    os.path.join(sys.exec_prefix, 'bin', 'python3')):
+        if os.path.exists(the_exe):
+            return the_exe
+    return exe
+#=========================================================================================
+
+def _share(ar):
+    ''' Copy a numpy array into a new shared memory block.
+        Return: the block and the spec needed to attach to it.
+    '''
+    #
+    shm = shared_memory.SharedMemory(create=True, size=max(1, ar.nbytes))
+    np.ndarray(ar.shape, dtype=ar.dtype, buffer=shm.buf)[...] = ar
+    return shm, (shm.name, ar.shape, ar.dtype.str)
+#=========================================================================================
+
+def _attach(spec):
+    ''' Attach to a shared memory block created by the main process. '''
+    #
+    name, shape, dtype = spec
+    # Workers share the resource tracker of the main process, which unlinks the block
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+#=========================================================================================
+
+def _work(specs, offsets, aziN, invs, args, kwargs):
+    ''' Worker: profile_block() of a range of lines.
+        offsets: offsets of the lines to process (absolute in the shared arrays)
+    '''
+    #
+    shms, arrays = zip(*[_attach(spec) for spec in specs])
+    try:
+        s, e = offsets[0], offsets[-1]
+        return profile_block(*[a[s:e] for a in arrays], offsets - s, aziN, invs,
+                             *args, **kwargs)
+    finally:
+        del arrays
+        for shm in shms:
+            shm.close()
+#=========================================================================================
+
+def split_lines(offsets, ntasks):
+    ''' Split lines in at most ntasks ranges of about the same number of points.
+        Return: list of (first line, last line + 1)
+    '''
+    #
+    nl = len(offsets) - 1
+    cuts = np.searchsorted(offsets, np.linspace(0, offsets[-1], ntasks + 1))
+    cuts = np.unique(np.clip(cuts, 0, nl))
+    cuts[0], cuts[-1] = 0, nl
+    return [(a, b) for a, b in zip(cuts[:-1], cuts[1:]) if b > a]
+#=========================================================================================
+
+class ProfilePool():
+    ''' Pool of worker processes of a run, shared by all calls of parallel_block().
+        The processes are only started by the first block large enough to be worth
+        it and are kept until close(). If the pool breaks (worker killed, no python
+        interpreter, no shared memory...) it is shut down and every later call runs
+        in the current process.
+
+        workers: number of worker processes (< 2: always run in the current process)
+        min_points: smallest block (in points) sent to the workers
+    '''
+    #
+    def __init__(self, workers, min_points=MIN_POINTS):
+        self.workers    = workers
+        self.min_points = min_points
+        self.broken     = workers < 2
+        self._pool      = None
+    #-------------------------------------------------------------------------------------
+
+    def accepts(self, npoints, nlines):
+        ''' True if a block of npoints points on nlines lines goes to the workers. '''
+        #
+        return not self.broken and npoints >= self.min_points and nlines > 1
+    #-------------------------------------------------------------------------------------
+
+    def executor(self):
+        ''' The process pool, started on first use. '''
+        #
+        if self._pool is None:
+            ctx = mp.get_context('spawn')
+            ctx.set_executable(python_executable())
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx)
+        return self._pool
+    #-------------------------------------------------------------------------------------
+
+    def close(self):
+        ''' Stop the worker processes. '''
+        #
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+    #-------------------------------------------------------------------------------------
+
+    def fail(self, err, feedback=None):
+        ''' Shut the pool down after an error: later calls run in the current process. '''
+        #
+        self.broken = True
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if feedback is not None:
+            feedback.pushInfo('Worker processes failed (%s: %s), '
+                              'profiles computed in the current process'
+                              % (type(err).__name__, err))
+    #-------------------------------------------------------------------------------------
+
+def parallel_block(X, Y, FID, Data, offsets, aziN, invs, args, kwargs, pool=None,
+                   feedback=None):
+    ''' Same as block.profile_block(X, Y, FID, Data, offsets, aziN, invs, *args,
+        **kwargs) but computed on a pool of processes.
+        pool: ProfilePool of the run (None: run in the current process)
+        feedback: if given, isCanceled() is checked as tasks complete and pool
+                  errors are reported with pushInfo()
+
+        Return: as profile_block(), None if canceled while the workers were running
+    '''
+    #
+    if pool is None or not pool.accepts(len(X), len(offsets) - 1):
+        return profile_block(X, Y, FID, Data, offsets, aziN, invs, *args, **kwargs)
+
+    blocks, specs = [], []
+    try:
+        for ar in (X, Y, FID, Data):
+            shm, spec = _share(np.ascontiguousarray(ar))
+            blocks.append(shm)
+            specs.append(spec)
+        executor = pool.executor()
+        jobs = [executor.submit(_work, specs, offsets[a:b+1], aziN[a:b], invs[a:b],
+                                args, kwargs)
+                for a, b in split_lines(offsets, 4 * pool.workers)]
+        results = []
+        for job in jobs:
+            if feedback is not None and feedback.isCanceled():
+                for j in jobs:
+                    j.cancel()
+                wait(jobs)
+                return None
+            results.append(job.result())
+    except (BrokenProcessPool, OSError) as err:
+        pool.fail(err, feedback)
+        return profile_block(X, Y, FID, Data, offsets, aziN, invs, *args, **kwargs)
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+    return merge_blocks(results)
+#=========================================================================================
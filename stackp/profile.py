@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        begin                : 2026-10-18
+        copyright            : (C) 2019-2026 by GeoProc.com
+        email                : info@geoproc.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 3 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+  PROFILE
+  Batch profile engine: all lines are processed at once on the concatenated
+  arrays of a LineStore (line i spans [offsets[i], offsets[i+1])).
+
+WARNING: code formatting does not follow pycodestyle recommendations
+"""
+
+import numpy as np
+
+
+def line_index(offsets):
+    ''' Return the line number of every point (int64 numpy array). '''
+    #
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+#=========================================================================================
+
+def line_geometry(X, Y, offsets):
+    ''' Geometry of every line.
+
+        Return: 3 numpy arrays (one value per line):
+                azimuth of first to last point (degrees, +'ve clockwise from North),
+                distance between end points,
+                cumulative length of the line
+    '''
+    #
+    s, e = offsets[:-1], offsets[1:] - 1
+    dx, dy = X[e] - X[s], Y[e] - Y[s]
+    aziN = np.degrees(np.arctan2(dx, dy))
+    dist = np.hypot(dx, dy)
+    csum = np.concatenate(([0.], np.cumsum(np.hypot(np.diff(X), np.diff(Y)))))
+    return aziN, dist, csum[e] - csum[s]
+#=========================================================================================
+
+def _axial_dist(a, b):
+    ''' Angle (degrees) between two axes (directions mod 180). '''
+    #
+    return np.abs(np.mod(a - b + 90., 180.) - 90.)
+#=========================================================================================
+
+def _axial_peak(ax, w, tol):
+    ''' Main axis (degrees, mod 180) of a set of weighted axes: peak of the axial
+        histogram (1 deg bins) smoothed over +/-tol, refined by the axial mean of
+        the axes within tol of the peak.
+    '''
+    #
+    hist = np.bincount(np.floor(ax).astype(np.int64) % 180, weights=w, minlength=180)
+    ht   = int(round(tol))
+    box  = np.convolve(np.r_[hist[-ht:], hist, hist[:ht]], np.ones(2 * ht + 1), 'valid')
+    peak = np.argmax(box) + .5
+    near = _axial_dist(ax, peak) <= tol
+    # Axial mean: mean of doubled angles
+    z = np.sum(w[near] * np.exp(2j * np.radians(ax[near])))
+    return np.mod(np.degrees(np.angle(z)) / 2., 180.)
+#=========================================================================================
+
+def _orient(axis, azi, w, rank):
+    ''' Direction (degrees, mod 360) of an axis, taken along the heading of one
+        line of its cluster: lowest rank, then heaviest (e.g. longest), then
+        smallest heading. It does not depend on the noise of the axis around
+        0/180 deg, nor on the order of the lines.
+    '''
+    #
+    head = np.mod(azi, 360.)
+    k    = np.lexsort((head, -w, rank))[0]
+    return axis if np.cos(np.radians(head[k] - axis)) >= 0. else axis + 180.
+#=========================================================================================
+
+def classify_lines(aziN, inv, weights=None, tol=20., rank=None):
+    ''' Line vs tie-line and profile direction of every line.
+        The axes of all lines (azimuth mod 180) are clustered with an axial
+        histogram: the main peak is the axis of the lines, the main peak of the
+        lines more than tol away from it is the axis of the tie-lines. Each line
+        belongs to the closest axis. Nothing depends on the order of the lines.
+        Each axis is oriented along the heading of a reference line of its
+        cluster: the line of lowest rank (e.g. first fiducial: the first line
+        flown, which new lines added to the survey do not change), the heaviest
+        one between lines of equal rank. Lines heading within 90 deg of their
+        oriented axis get inv, lines heading the other way get -inv, so that all
+        profiles are on the same side of parallel lines; tie-lines are flipped.
+        aziN:    azimuth of the lines (degrees, +'ve clockwise from North)
+        inv:     1 (default) or -1 to reverse profiles
+        weights: weight of each line in the histogram, e.g. its length, so that
+                 short oblique lines do not drive the result (None: same weight)
+        tol:     half width (degrees) of a cluster of axes
+        rank:    None or one value per line, to choose the reference lines
+
+        Return: inv of each line (int numpy array) and type of each line ('L' or 'T')
+    '''
+    #
+    azi = 90. - np.asarray(aziN, dtype=np.float64)     # angle +'ve CCW from East
+    n   = len(azi)
+    if n == 0:
+        return np.empty(0, dtype=np.int64), []
+    w   = np.ones(n) if weights is None else np.asarray(weights, dtype=np.float64)
+    rk  = np.zeros(n) if rank is None else np.asarray(rank, dtype=np.float64)
+    ax  = np.mod(azi, 180.)
+    refL = _axial_peak(ax, w, tol)
+    bT   = np.zeros(n, dtype=bool)
+    far  = _axial_dist(ax, refL) > tol
+    if far.any() and w[far].sum() > 0:
+        refT = _axial_peak(ax[far], w[far], tol)
+        bT   = _axial_dist(ax, refT) < _axial_dist(ax, refL)
+    ref  = np.full(n, _orient(refL, azi[~bT], w[~bT], rk[~bT]))
+    if bT.any():
+        ref[bT] = _orient(refT, azi[bT], w[bT], rk[bT])
+    # Heading opposite to the axis of its cluster: flip
+    d    = np.mod(azi - ref, 360.)
+    invs = np.where((d > 90.) & (d < 270.), -inv, inv).astype(np.int64)
+    invs[bT] = -invs[bT]
+    return invs, np.where(bT, 'T', 'L').tolist()
+#=========================================================================================
+
+def build_profiles(X, Y, Data, offsets, aziN, invs, dmean, mult, scale, offset):
+    ''' Compute the profile coordinates of all lines.
+        Each line is rotated to horizontal about its first point, its Y-coords are
+        replaced by the scaled data (centred on the mean Y-coord of the line) and
+        the line is rotated back to its original angle.
+        X, Y, Data: concatenated arrays of all lines, sorted by fiducial
+        offsets:    line i spans [offsets[i], offsets[i+1])
+        aziN, invs: azimuth and profile direction of each line
+        dmean, mult: data mean and data to map units multiplier
+        scale, offset: profile scale and offset
+
+        Return: 2 numpy arrays: X and Y profile coordinates of all points
+    '''
+    #
+    idx    = line_index(offsets)
+    s      = offsets[:-1]
+    theta  = np.radians(aziN - 90.)     # -azi, azi +'ve CCW from East
+    co, si = np.cos(theta)[idx], np.sin(theta)[idx]
+    cx, cy = X[s][idx], Y[s][idx]       # centres of rotation
+
+    # Rotate lines to horizontal (relative to centres of rotation)
+    tx, ty = X - cx, Y - cy
+    px = tx * co - ty * si
+    py = tx * si + ty * co
+
+    # Change Y-coords to scaled data, around mean Y-coord of each line
+    mn = (np.add.reduceat(py, s) / np.diff(offsets))[idx]
+    Yb = invs[idx] * (scale * (Data - dmean) * mult + offset) + mn
+
+    # Rotate lines back to original angle: cos(azi) = co, sin(azi) = -si
+    return px * co + Yb * si + cx, -px * si + Yb * co + cy
+#=========================================================================================
+
+def split_gaps(X, Y, FID, Data, offsets, fid_gap=0, dist_gap=0.):
+    ''' Split all lines in parts at gaps: dummy values (NaN in Data), fiducial
+        steps larger than fid_gap and distances between consecutive points larger
+        than dist_gap (0: unused). Parts of less than 2 points are dropped.
+        X, Y, FID, Data: concatenated arrays of all lines, sorted by fiducial
+        offsets:         line i spans [offsets[i], offsets[i+1])
+
+        Return: boolean mask of the points kept,
+                offsets of the parts in the points kept (part j spans
+                [poffs[j], poffs[j+1])),
+                parts of each line (line i is made of parts [parts[i], parts[i+1]))
+    '''
+    #
+    n    = len(X)
+    good = ~np.isnan(Data)
+    # A part starts at the first point of a line and after a dummy value
+    brk = np.zeros(n, dtype=bool)
+    brk[offsets[:-1][offsets[:-1] < n]] = True
+    brk[1:] |= ~good[:-1]
+    # ... and where consecutive valid points are too far apart
+    iv = np.flatnonzero(good)
+    if fid_gap > 0 and len(iv) > 1:
+        brk[iv[1:][np.diff(FID[iv]) > fid_gap]] = True
+    if dist_gap > 0. and len(iv) > 1:
+        brk[iv[1:][np.hypot(np.diff(X[iv]), np.diff(Y[iv])) > dist_gap]] = True
+    starts = np.flatnonzero(brk[iv])
+    plen   = np.diff(np.r_[starts, len(iv)])
+    # Line of every part, from the first point of the part (before dropping any)
+    pline  = line_index(offsets)[iv[starts]]
+    # Drop single points: not a line
+    ok     = plen > 1
+    iv     = iv[np.repeat(ok, plen)]
+    pline  = pline[ok]
+    keep   = np.zeros(n, dtype=bool)
+    keep[iv] = True
+    poffs  = np.r_[0, np.cumsum(plen[ok])]
+    parts  = np.r_[0, np.cumsum(np.bincount(pline, minlength=len(offsets) - 1))]
+    return keep, poffs, parts
+#=========================================================================================
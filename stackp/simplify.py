@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        begin                : 2026-10-18
+        copyright            : (C) 2019-2026 by GeoProc.com
+        email                : info@geoproc.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 3 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+  SIMPLIFY
+  Douglas-Peucker decimation of all lines of a block at once
+
+WARNING: code formatting does not follow pycodestyle recommendations
+"""
+
+import numpy as np
+
+
+def simplify_lines(X, Y, offsets, tol):
+    ''' Douglas-Peucker simplification of all lines at once.
+        Every iteration splits all pending segments of all lines together, so the
+        number of python loops is the depth of the recursion (~log2 of the number
+        of points of the longest line), not the number of segments.
+        No point is further than tol (map units) from the simplified line. The
+        first and last points of every line are always kept.
+        X, Y:    coordinates of all lines
+        offsets: line i spans [offsets[i], offsets[i+1])
+
+        Return: boolean mask of the points kept and the offsets of the lines
+                made of the points kept
+    '''
+    #
+    keep = np.zeros(len(X), dtype=bool)
+    s, e = offsets[:-1], offsets[1:] - 1
+    keep[s] = True
+    keep[e] = True
+    # Pending segments: first and last point, with at least one point in between
+    ok = e - s > 1
+    s, e = s[ok], e[ok]
+    while len(s):
+        nin = e - s - 1
+        seg = np.repeat(np.arange(len(s)), nin)
+        beg = np.cumsum(nin) - nin
+        idx = np.arange(nin.sum()) - beg[seg] + s[seg] + 1
+        # Distance of every inner point to the chord of its segment
+        x0, y0 = X[s][seg], Y[s][seg]
+        dx, dy = (X[e] - X[s])[seg], (Y[e] - Y[s])[seg]
+        px, py = X[idx] - x0, Y[idx] - y0
+        chord = np.hypot(dx, dy)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            d = np.where(chord > 0., np.abs(dx * py - dy * px) / chord, np.hypot(px, py))
+        # Furthest point of every segment
+        dmax = np.maximum.reduceat(d, beg)
+        first = np.flatnonzero(d == dmax[seg])
+        _, ix = np.unique(seg[first], return_index=True)
+        split = idx[first[ix]]
+        # Split segments that are too far from their chord
+        far = dmax > tol
+        keep[split[far]] = True
+        s = np.concatenate((s[far], split[far]))
+        e = np.concatenate((split[far], e[far]))
+        ok = e - s > 1
+        s, e = s[ok], e[ok]
+    kept = np.add.reduceat(keep.astype(np.int64), offsets[:-1])
+    return keep, np.r_[0, np.cumsum(kept)]
+#=========================================================================================
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        begin                : 2026-10-18
+        copyright            : (C) 2019-2026 by GeoProc.com
+        email                : info@geoproc.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 3 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+  STATS
+  Streaming statistics computed block by block on numpy arrays
+
+WARNING: code formatting does not follow pycodestyle recommendations
+"""
+
+import numpy as np
+
+
+class StreamStats():
+    ''' Count, mean, min, max and variance of a stream of values, updated by blocks.
+        Blocks are combined with the parallel form of Welford's algorithm (Chan et al.),
+        so that two accumulators (e.g. from two worker processes) can be merged.
+        dummy: values within tol of dummy are ignored, as are NaN's.
+    '''
+    #
+    def __init__(self, dummy=None, tol=1e-6):
+        self.dummy = dummy
+        self.tol   = tol
+        self.count = 0
+        self.mean  = 0.
+        self.m2    = 0.
+        self.min   = np.inf
+        self.max   = -np.inf
+    #-------------------------------------------------------------------------------------
+
+    def _combine(self, n, mean, m2, mn, mx):
+        ''' Merge the moments of a block into the accumulator. '''
+        #
+        if n == 0:
+            return
+        tot   = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / tot
+        self.m2   += m2 + delta * delta * self.count * n / tot
+        self.count = tot
+        self.min   = min(self.min, mn)
+        self.max   = max(self.max, mx)
+    #-------------------------------------------------------------------------------------
+
+    def update(self, values):
+        ''' Add a block of values (numpy array). '''
+        #
+        v = np.asarray(values, dtype=np.float64)
+        ok = ~np.isnan(v)
+        if self.dummy is not None:
+            ok &= np.abs(v - self.dummy) >= self.tol
+        if not ok.all():
+            v = v[ok]
+        if len(v) == 0:
+            return
+        mean = v.mean()
+        self._combine(len(v), mean, float(((v - mean)**2).sum()), v.min(), v.max())
+    #-------------------------------------------------------------------------------------
+
+    def merge(self, other):
+        ''' Add the values seen by another accumulator. '''
+        #
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+    #-------------------------------------------------------------------------------------
+
+    def variance(self):
+        ''' Population variance of the values (NaN if no value). '''
+        #
+        return self.m2 / self.count if self.count else np.nan
+    #-------------------------------------------------------------------------------------
+
+    def as_dict(self):
+        ''' Return the statistics as a dictionary of python numbers. '''
+        #
+        return {'count':int(self.count), 'mean':float(self.mean), 'm2':float(self.m2),
+                'min':float(self.min), 'max':float(self.max)}
+    #-------------------------------------------------------------------------------------
+
+    @classmethod
+    def from_dict(cls, dico):
+        ''' Return an accumulator from as_dict() values. '''
+        #
+        stats = cls()
+        stats.count, stats.mean, stats.m2 = dico['count'], dico['mean'], dico['m2']
+        stats.min, stats.max = dico['min'], dico['max']
+        return stats
+    #-------------------------------------------------------------------------------------
+#=========================================================================================
+
+class QuantileSketch():
+    ''' Bounded-memory streaming quantile sketch (KLL-like compactor hierarchy).
+        Values go to level 0; when a level holds more than k values it is sorted and
+        every other value (random start) is promoted to the next level, where each
+        value weighs twice as much. Memory is about k * log2(n / k) values, the rank
+        error is in the order of log2(n / k) / k. Sketches can be merged.
+        dummy: values within tol of dummy are ignored, as are NaN's.
+        seed: seed of the random generator (results are reproducible)
+    '''
+    #
+    def __init__(self, k=1024, dummy=None, tol=1e-6, seed=0):
+        self.k      = int(k)
+        self.dummy  = dummy
+        self.tol    = tol
+        self.levels = [np.empty(0)]
+        self.count  = 0
+        self._rng   = np.random.default_rng(seed)
+    #-------------------------------------------------------------------------------------
+
+    def _compress(self):
+        ''' Compact every level holding more than k values. '''
+        #
+        h = 0
+        while h < len(self.levels):
+            buf = self.levels[h]
+            if len(buf) > self.k:
+                buf = np.sort(buf)
+                keep = buf[len(buf) - len(buf) % 2:]     # odd value stays at this level
+                up = buf[self._rng.integers(2):len(buf) - len(buf) % 2:2]
+                self.levels[h] = keep
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h+1] = np.concatenate((self.levels[h+1], up))
+            h += 1
+    #-------------------------------------------------------------------------------------
+
+    def update(self, values):
+        ''' Add a block of values (numpy array). '''
+        #
+        v = np.asarray(values, dtype=np.float64)
+        ok = ~np.isnan(v)
+        if self.dummy is not None:
+            ok &= np.abs(v - self.dummy) >= self.tol
+        v = v[ok]
+        if len(v) == 0:
+            return
+        self.count += len(v)
+        self.levels[0] = np.concatenate((self.levels[0], v))
+        self._compress()
+    #-------------------------------------------------------------------------------------
+
+    def merge(self, other):
+        ''' Add the values seen by another sketch. '''
+        #
+        for h, buf in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate((self.levels[h], buf))
+        self.count += other.count
+        self._compress()
+    #-------------------------------------------------------------------------------------
+
+    def quantiles(self, qs):
+        ''' Return the approximate quantiles qs (0. to 1., sequence) as numpy array. '''
+        #
+        vals = np.concatenate(self.levels)
+        if len(vals) == 0:
+            return np.full(len(qs), np.nan)
+        wts = np.concatenate([np.full(len(b), 2.**h) for h, b in enumerate(self.levels)])
+        order = np.argsort(vals, kind='stable')
+        vals, cw = vals[order], np.cumsum(wts[order])
+        ix = np.searchsorted(cw, np.asarray(qs, dtype=np.float64) * cw[-1], 'left')
+        return vals[np.clip(ix, 0, len(vals) - 1)]
+    #-------------------------------------------------------------------------------------
+
+    def as_dict(self):
+        ''' Return the sketch as a dictionary of python numbers and lists. '''
+        #
+        return {'k':self.k, 'count':int(self.count),
+                'levels':[b.tolist() for b in self.levels]}
+    #-------------------------------------------------------------------------------------
+
+    @classmethod
+    def from_dict(cls, dico):
+        ''' Return a sketch from as_dict() values. '''
+        #
+        sketch = cls(dico['k'])
+        sketch.count  = dico['count']
+        sketch.levels = [np.array(b, dtype=np.float64) for b in dico['levels']]
+        return sketch
+    #-------------------------------------------------------------------------------------
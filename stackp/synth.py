@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        begin                : 2026-10-18
+        copyright            : (C) 2019-2026 by GeoProc.com
+        email                : info@geoproc.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 3 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+  SYNTH
+  Signal of synthetic surveys: running mean and random spikes, shared by
+  bcGenRNDSurveyData3 and the bcStackP benchmarks (bench/survey.py).
+
+WARNING: code formatting does not follow pycodestyle recommendations
+"""
+
+import numpy as np
+
+# Default spikes: 0.768% of the points, classes amplitude:weight (amplitudes in base
+# levels, historical distribution of the spikes)
+SPIKE_RATE    = 0.768
+SPIKE_CLASSES = '2:5.18, 2.8146:1, 3.7528:1, 6:0.5'
+
+
+def smooth(V, k=5):
+    ''' Running mean over k points along the last axis (wrapped around). '''
+    #
+    return sum(np.roll(V, i, -1) for i in range(k)) / k
+#=========================================================================================
+
+def parse_spikes(txt):
+    ''' Parse a spike classes string: 'amplitude:weight, amplitude:weight, ...'
+        Amplitudes in base levels, weights relative (any positive numbers).
+        Raise ValueError(the wrong class) on a wrong class.
+
+        Return: arrays of amplitudes and of probabilities (sum: 1)
+    '''
+    #
+    amp, wgt = [], []
+    for the_cls in txt.replace(';', ',').split(','):
+        if the_cls.strip() == '':
+            continue
+        try:
+            a, w = [float(v) for v in the_cls.split(':')]
+        except ValueError:
+            a = w = 0.
+        if a <= 0. or w <= 0.:
+            raise ValueError(the_cls.strip())
+        amp.append(a)
+        wgt.append(w)
+    if not amp:
+        return np.zeros(1), np.ones(1)
+    return np.array(amp), np.array(wgt) / sum(wgt)
+#=========================================================================================
+
+def spikes(rng, n, rate=SPIKE_RATE / 100., amp=None, p=None):
+    ''' Random spikes: one categorical draw for all points.
+        rng:    numpy random Generator
+        n:      number of points (or shape of the array)
+        rate:   fraction of the points with a spike, as many positive as negative
+        amp, p: amplitudes and probabilities of the classes (parse_spikes();
+                None: SPIKE_CLASSES)
+
+        Return: array with random spikes (+/- the class amplitudes, in base levels)
+    '''
+    #
+    if amp is None:
+        amp, p = parse_spikes(SPIKE_CLASSES)
+    p = rate * p / 2.
+    return rng.choice(np.r_[0., amp, -amp], n, p=np.r_[1. - 2. * p.sum(), p, p])
+#=========================================================================================
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        begin                : 2026-10-18
+        copyright            : (C) 2019-2026 by GeoProc.com
+        email                : info@geoproc.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 3 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+  TIMING
+  Per-phase wall time, throughput (points/s) and memory of a run. The memory of a
+  phase is the peak RSS of the process when the phase last stopped: it never goes
+  down and only shows the memory used by a phase when it reaches a new peak.
+
+WARNING: code formatting does not follow pycodestyle recommendations
+"""
+
+import sys
+import time
+import json
+import platform
+try:
+    import resource
+except ImportError:     # Windows
+    resource = None
+
+
+def peak_rss():
+    ''' Peak resident set size of the process so far, in MB (None if unknown). '''
+    #
+    if resource is not None:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kB on Linux, bytes on macOS
+        return rss / (1048576. if sys.platform == 'darwin' else 1024.)
+    try:
+        import psutil
+        mi = psutil.Process().memory_info()
+        return getattr(mi, 'peak_wset', mi.rss) / 1048576.
+    except (ImportError, AttributeError):
+        return None
+#=========================================================================================
+
+class PhaseTimer():
+    ''' Wall time, number of points and process peak memory at the end of the
+        phases of a run.
+        Phases are exclusive: starting a phase inside another one pauses the outer
+        phase until the inner one stops (e.g. writes inside the profile loop). A
+        phase can be started and stopped any number of times: its times add up.
+
+        Usage:
+            timer = PhaseTimer()
+            with timer.phase('read'):
+                ...
+            timer.count('read', npts)
+            for line in timer.report(): print(line)
+    '''
+    #
+    def __init__(self):
+        self.phases = {}        # name: [seconds, points, peak RSS (MB) at stop]
+        self._stack = []        # [name, start time] of the running phases
+        self._t0    = time.perf_counter()
+    #-------------------------------------------------------------------------------------
+
+    def _add(self, name, dt):
+        ph = self.phases.setdefault(name, [0., 0, None])
+        ph[0] += dt
+    #-------------------------------------------------------------------------------------
+
+    def start(self, name):
+        ''' Start (or resume) phase name, pausing the running phase if any. '''
+        #
+        now = time.perf_counter()
+        if self._stack:
+            top = self._stack[-1]
+            self._add(top[0], now - top[1])
+        self._stack.append([name, now])
+        self.phases.setdefault(name, [0., 0, None])
+    #-------------------------------------------------------------------------------------
+
+    def stop(self):
+        ''' Stop the running phase and resume the one it paused, if any. '''
+        #
+        if not self._stack:
+            return
+        now = time.perf_counter()
+        name, t = self._stack.pop()
+        self._add(name, now - t)
+        self.phases[name][2] = peak_rss()
+        if self._stack:
+            self._stack[-1][1] = now
+    #-------------------------------------------------------------------------------------
+
+    def phase(self, name):
+        ''' Context manager running phase name. '''
+        #
+        return _Phase(self, name)
+    #-------------------------------------------------------------------------------------
+
+    def count(self, name, npts):
+        ''' Add npts points processed to phase name. '''
+        #
+        self.phases.setdefault(name, [0., 0, None])[1] += int(npts)
+    #-------------------------------------------------------------------------------------
+
+    def as_dict(self):
+        ''' Dictionary of the phases (in order of first start) and of the whole run. '''
+        #
+        total = time.perf_counter() - self._t0
+        phases = []
+        for name, (dt, npts, rss) in self.phases.items():
+            pps = round(npts / dt, 1) if npts and dt > 0. else None
+            phases.append({'phase':name, 'seconds':round(dt, 4), 'points':npts,
+                           'points_per_s':pps,
+                           'process_peak_mb':None if rss is None else round(rss, 1)})
+        rss = peak_rss()
+        return {'phases':phases, 'total_seconds':round(total, 4),
+                'peak_rss_mb':None if rss is None else round(rss, 1),
+                'python':platform.python_version(), 'platform':platform.platform()}
+    #-------------------------------------------------------------------------------------
+
+    def report(self):
+        ''' Lines of text of the timing report. '''
+        #
+        d = self.as_dict()
+        lines = ['%-12s %10s %12s %12s %14s' % ('Phase', 'Time (s)', 'Points',
+                                                 'Points/s', 'Proc. peak MB')]
+        for ph in d['phases']:
+            lines.append('%-12s %10.3f %12d %12s %14s' % (
+                ph['phase'], ph['seconds'], ph['points'],
+                '-' if ph['points_per_s'] is None else '%.0f' % ph['points_per_s'],
+                '-' if ph['process_peak_mb'] is None else '%.1f' % ph['process_peak_mb']))
+        lines.append('%-12s %10.3f %12s %12s %14s' % (
+            'Total', d['total_seconds'], '', '',
+            '-' if d['peak_rss_mb'] is None else '%.1f' % d['peak_rss_mb']))
+        lines.append('Proc. peak MB: peak memory (RSS) of the process at the end of '
+                     'the phase')
+        return lines
+    #-------------------------------------------------------------------------------------
+
+    def save(self, fname, extra=None):
+        ''' Write the report as JSON to fname, with the optional dictionary extra
+            (e.g. version, parameters). Return: True on success.
+        '''
+        #
+        d = self.as_dict()
+        if extra:
+            d.update(extra)
+        try:
+            with open(fname, 'w') as fo:
+                json.dump(d, fo, indent=1)
+        except OSError:
+            return False
+        return True
+    #-------------------------------------------------------------------------------------
+
+class _Phase():
+    ''' Context manager of PhaseTimer.phase(). '''
+    #
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name  = name
+
+    def __enter__(self):
+        self.timer.start(self.name)
+        return self.timer
+
+    def __exit__(self, *args):
+        self.timer.stop()
+        return False
+    #-------------------------------------------------------------------------------------
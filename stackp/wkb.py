@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        begin                : 2026-10-18
+        copyright            : (C) 2019-2026 by GeoProc.com
+        email                : info@geoproc.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 3 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+  WKB
+  Bulk decoding of point geometries from Well-Known Binary (ISO and 2.5D flavours)
+  and bulk encoding of (Multi)LineStringM and MultiPolygon geometries
+
+WARNING: code formatting does not follow pycodestyle recommendations
+"""
+
+import struct
+import numpy as np
+
+WKB_POINT            = 1
+WKB_POLYGON          = 3
+WKB_MULTIPOINT       = 4
+WKB_MULTIPOLYGON     = 6
+WKB_LINESTRINGM      = 2002
+WKB_MULTILINESTRINGM = 2005
+
+
+def wkb_dims(wkb_type):
+    ''' Return (base type, number of ordinates) of a WKB geometry type. '''
+    #
+    nd = 2
+    if wkb_type & 0x80000000:          # 2.5D flag (Z)
+        nd += 1
+    if wkb_type & 0x40000000:          # EWKB M flag
+        nd += 1
+    t = wkb_type & 0x0fffffff
+    nd += {0:0, 1:1, 2:1, 3:2}.get(t // 1000, 0)
+    return t % 1000, nd
+#=========================================================================================
+
+def _point_dtype(bo, nd):
+    ''' Numpy structured type of one WKB point record. '''
+    #
+    e = '<' if bo == 1 else '>'
+    return np.dtype([('bo', 'u1'), ('type', e+'u4'), ('xy', e+'f8', (nd,))])
+#=========================================================================================
+
+def _decode_one(blob):
+    ''' Decode one point or multipoint blob. Return a list of (x, y). '''
+    #
+    e = '<' if blob[0] == 1 else '>'
+    base, nd = wkb_dims(struct.unpack_from(e+'I', blob, 1)[0])
+    if base == WKB_POINT:
+        return [struct.unpack_from(e+'dd', blob, 5)]
+    if base == WKB_MULTIPOINT:
+        n = struct.unpack_from(e+'I', blob, 5)[0]
+        pts, pos = [], 9
+        for i in range(n):
+            pe = '<' if blob[pos] == 1 else '>'
+            _, pnd = wkb_dims(struct.unpack_from(pe+'I', blob, pos+1)[0])
+            pts.append(struct.unpack_from(pe+'dd', blob, pos+5))
+            pos += 5 + 8 * pnd
+        return pts
+    raise ValueError('Not a point geometry (WKB type %d)' % base)
+#=========================================================================================
+
+def points_from_wkb(blobs):
+    ''' Decode a list of point or multipoint WKB blobs (bytes).
+        Single points of the same flavour (the usual case) are decoded in one
+        numpy call, anything else falls back to a per-blob decoding.
+
+        Return: x, y (float64 numpy arrays, one entry per point) and
+                counts (number of points of each blob, int64 numpy array)
+    '''
+    #
+    nb = len(blobs)
+    if nb == 0:
+        e = np.empty(0)
+        return e, e.copy(), np.empty(0, dtype=np.int64)
+    first = blobs[0]
+    base, nd = wkb_dims(struct.unpack_from('<I' if first[0] == 1 else '>I', first, 1)[0])
+    if base == WKB_POINT:
+        dt  = _point_dtype(first[0], nd)
+        buf = b''.join(blobs)
+        if len(buf) == nb * dt.itemsize:
+            rec = np.frombuffer(buf, dtype=dt)
+            if (rec['bo'] == first[0]).all() and (rec['type'] == rec['type'][0]).all():
+                return (rec['xy'][:, 0].copy(), rec['xy'][:, 1].copy(),
+                        np.ones(nb, dtype=np.int64))
+    # Mixed or multipoint geometries
+    x, y, counts = [], [], np.empty(nb, dtype=np.int64)
+    for i, blob in enumerate(blobs):
+        pts = _decode_one(blob)
+        counts[i] = len(pts)
+        for px, py in pts:
+            x.append(px)
+            y.append(py)
+    return np.array(x, dtype=np.float64), np.array(y, dtype=np.float64), counts
+#=========================================================================================
+
+def linestrings_m_wkb(x, y, m, offsets, ends=None):
+    ''' Encode several lines as ISO WKB LineStringM (little endian).
+        x, y, m: concatenated coordinates and measures of all lines
+        offsets: line i spans [offsets[i], offsets[i+1])
+        ends:    None, or (x0, y0, x1, y1) arrays: one point (m = 0) added at the
+                 start and one at the end of each line
+
+        Return: list of bytes, one WKB per line
+    '''
+    #
+    xym = np.empty((len(x), 3), dtype='<f8')
+    xym[:, 0], xym[:, 1], xym[:, 2] = x, y, m
+    buf = memoryview(xym.tobytes())
+    wkbs = []
+    for i, (s, e) in enumerate(zip(offsets[:-1], offsets[1:])):
+        if ends is None:
+            wkbs.append(struct.pack('<BII', 1, WKB_LINESTRINGM, e - s) + buf[24*s:24*e])
+        else:
+            wkbs.append(b''.join((struct.pack('<BIIddd', 1, WKB_LINESTRINGM, e - s + 2,
+                                              ends[0][i], ends[1][i], 0.),
+                                  buf[24*s:24*e],
+                                  struct.pack('<ddd', ends[2][i], ends[3][i], 0.))))
+    return wkbs
+#=========================================================================================
+
+def multilinestrings_m_wkb(x, y, m, offsets, parts, ends=None):
+    ''' Encode several lines as ISO WKB MultiLineStringM (little endian).
+        x, y, m: concatenated coordinates and measures of all parts of all lines
+        offsets: part j spans [offsets[j], offsets[j+1])
+        parts:   line i is made of parts [parts[i], parts[i+1])
+        ends:    None, or (x0, y0, x1, y1) arrays: one point (m = 0) added at the
+                 start of the first part and one at the end of the last part of
+                 each line
+
+        Return: list of bytes, one WKB per line
+    '''
+    #
+    xym = np.empty((len(x), 3), dtype='<f8')
+    xym[:, 0], xym[:, 1], xym[:, 2] = x, y, m
+    buf = memoryview(xym.tobytes())
+    wkbs = []
+    for i, (p0, p1) in enumerate(zip(parts[:-1], parts[1:])):
+        chunks = [struct.pack('<BII', 1, WKB_MULTILINESTRINGM, p1 - p0)]
+        for j in range(p0, p1):
+            s, e = offsets[j], offsets[j+1]
+            head = ends is not None and j == p0
+            tail = ends is not None and j == p1 - 1
+            chunks.append(struct.pack('<BII', 1, WKB_LINESTRINGM, e - s + head + tail))
+            if head:
+                chunks.append(struct.pack('<ddd', ends[0][i], ends[1][i], 0.))
+            chunks.append(buf[24*s:24*e])
+            if tail:
+                chunks.append(struct.pack('<ddd', ends[2][i], ends[3][i], 0.))
+        wkbs.append(b''.join(chunks))
+    return wkbs
+#=========================================================================================
+
+def multipolygons_wkb(x, y, offsets, groups):
+    ''' Encode several ISO WKB MultiPolygon (little endian) made of single ring
+        polygons.
+        x, y:    concatenated coordinates of all closed rings
+        offsets: ring j spans [offsets[j], offsets[j+1])
+        groups:  multipolygon i is made of rings [groups[i], groups[i+1])
+
+        Return: list of bytes, one WKB per multipolygon
+    '''
+    #
+    xy = np.empty((len(x), 2), dtype='<f8')
+    xy[:, 0], xy[:, 1] = x, y
+    buf = memoryview(xy.tobytes())
+    wkbs = []
+    for g0, g1 in zip(groups[:-1], groups[1:]):
+        chunks = [struct.pack('<BII', 1, WKB_MULTIPOLYGON, g1 - g0)]
+        for j in range(g0, g1):
+            s, e = offsets[j], offsets[j+1]
+            chunks.append(struct.pack('<BIII', 1, WKB_POLYGON, 1, e - s))
+            chunks.append(buf[16*s:16*e])
+        wkbs.append(b''.join(chunks))
+    return wkbs
+#=========================================================================================
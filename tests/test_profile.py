@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+        begin                : 2026-10-18
+        copyright            : (C) 2019-2026 by GeoProc.com
+        email                : info@geoproc.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 3 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+  TEST_PROFILE
+  Tests of stackp.profile (no QGIS needed): python -m pytest tests
+
+WARNING: code formatting does not follow pycodestyle recommendations
+"""
+
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stackp.profile import split_gaps
+
+
+def _split(data, offsets, **kw):
+    n = len(data)
+    X = np.arange(n, dtype=float)
+    return split_gaps(X, np.zeros(n), np.arange(n), np.array(data, dtype=float),
+                      np.array(offsets), **kw)
+#=========================================================================================
+
+def test_split_gaps_single_points_dropped():
+    # Line 0: single valid points between dummies, then a part of 3 points
+    # Line 1: one part of 3 points
+    nan = np.nan
+    keep, poffs, parts = _split([1, nan, 1, nan, 1, 1, 1, 2, 2, 2], [0, 7, 10])
+    assert keep.tolist() == [False] * 4 + [True] * 6
+    assert poffs.tolist() == [0, 3, 6]
+    assert parts.tolist() == [0, 1, 2]
+#=========================================================================================
+
+def test_split_gaps_line_without_part():
+    # Line 0 is only single points: no part, line 1 keeps its own part
+    nan = np.nan
+    keep, poffs, parts = _split([1, nan, 1, 2, 2, nan, 2, 2], [0, 3, 8])
+    assert keep.tolist() == [False] * 3 + [True, True, False, True, True]
+    assert poffs.tolist() == [0, 2, 4]
+    assert parts.tolist() == [0, 0, 2]
+#=========================================================================================
+
+def test_split_gaps_fiducial_gap():
+    keep, poffs, parts = _split([1, 1, 1, 1, 1, 1], [0, 6], fid_gap=0.5)
+    assert not keep.any()
+    assert poffs.tolist() == [0]
+    assert parts.tolist() == [0, 0]
+#=========================================================================================